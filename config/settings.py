@@ -5,6 +5,7 @@ Configurações Essenciais - YoloV8 Inference
 ==========================================
 Configure aqui os diretórios e parâmetros principais do sistema
 """
+import os
 from pathlib import Path
 
 # =============================================================================
@@ -23,7 +24,8 @@ PRETRAINED_MODELS_DIR = MODELS_DIR / "pretrained"  # ← Modelos baixados automa
 TRAINED_MODELS_DIR = MODELS_DIR / "trained"        # ← Seus modelos customizados
 
 # 📊 Diretório de resultados
-OUTPUT_DIR = PROJECT_ROOT / "output"                # ← Resultados JSON e imagens anotadas
+# Use YOLO_OUTPUT_DIR=/dev/shm/yolo_out (tmpfs) ou /tmp (Lambda) para gravar fora do disco do projeto
+OUTPUT_DIR = Path(os.getenv("YOLO_OUTPUT_DIR") or PROJECT_ROOT / "output")  # ← Resultados JSON e imagens anotadas
 
 # =============================================================================
 # ⚙️ CONFIGURAÇÕES DE INFERÊNCIA (ALTERE SE NECESSÁRIO)
@@ -37,6 +39,71 @@ DEFAULT_CONFIDENCE_THRESHOLD = 0.25
 # IoU threshold para Non-Maximum Suppression
 DEFAULT_IOU_THRESHOLD = 0.45
 
+# Tamanho de entrada do modelo (YOLO usa 640x640)
+DEFAULT_IMAGE_SIZE = 640
+
+# =============================================================================
+# 🚀 ACELERAÇÃO TENSORRT (REQUER GPU NVIDIA + TENSORRT INSTALADO)
+# =============================================================================
+# Exporta o modelo .pt para um engine TensorRT FP16 (.engine) na primeira
+# execução e reutiliza o engine salvo ao lado do .pt nas próximas.
+# Opcional (a exportação leva minutos e exige TensorRT): ative com YOLO_TENSORRT=1.
+# Só tem efeito com GPU CUDA disponível
+USE_TENSORRT_ENGINE = os.getenv("YOLO_TENSORRT", "").lower() in ("1", "true")
+
+# Tamanho máximo de lote suportado pelo engine exportado (shape dinâmico)
+TENSORRT_MAX_BATCH_SIZE = 16
+
+# Precisão do engine: "fp16" (quase sem perda), "int8" (mais rápido, requer
+# calibração) ou "fp32" (não exporta, usa o .pt). Altere com YOLO_TENSORRT_PRECISION
+TENSORRT_PRECISION = os.getenv("YOLO_TENSORRT_PRECISION", "fp16").lower()
+
+# Dataset (YAML no formato Ultralytics) usado na calibração INT8.
+# None → gera um dataset com imagens de INFERENCE_DATA_DIR
+INT8_CALIBRATION_DATA = None
+
+# Quantidade máxima de imagens usadas na calibração INT8
+INT8_CALIBRATION_IMAGES = 200
+
+# Memória (GB) disponível ao TensorRT durante a construção do engine
+TENSORRT_WORKSPACE_GB = 4
+
+# Compila o modelo PyTorch com torch.compile no aquecimento (sem TensorRT).
+# Compilação inicial lenta; ganha em execuções longas. Ative com YOLO_TORCH_COMPILE=1
+USE_TORCH_COMPILE = os.getenv("YOLO_TORCH_COMPILE", "").lower() in ("1", "true")
+
+# Libera o cache de memória da GPU a cada N imagens em lotes grandes (0 = nunca)
+CUDA_EMPTY_CACHE_EVERY = 100
+
+# Inferências de aquecimento após carregar o engine (esconde o setup da 1ª chamada)
+WARMUP_RUNS = 2
+
+# Núcleos de CPU que o processo pode usar (respeita a afinidade do container/Lambda;
+# os.cpu_count() informa os núcleos do host inteiro)
+CPU_COUNT = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+# Threads de CPU do PyTorch/OpenMP. Ajuste com YOLO_CPU_THREADS (padrão: CPU_COUNT)
+CPU_THREADS = max(1, int(os.getenv("YOLO_CPU_THREADS") or CPU_COUNT))
+
+# =============================================================================
+# 📄 CONFIGURAÇÕES DE SAÍDA
+# =============================================================================
+# JSON indentado (legível, ~2x maior e mais lento). Ative com YOLO_PRETTY_JSON=1
+PRETTY_JSON_OUTPUT = os.getenv("YOLO_PRETTY_JSON", "").lower() in ("1", "true")
+
+# Qualidade JPEG das imagens anotadas (85 reduz ~30% do tamanho sem perda visível)
+ANNOTATED_JPEG_QUALITY = 85
+
+# Devolve a imagem anotada na resposta (JPEG base64) em vez de gravar em disco.
+# Ative com YOLO_ANNOTATED_BYTES=1
+RETURN_ANNOTATED_BYTES = os.getenv("YOLO_ANNOTATED_BYTES", "").lower() in ("1", "true")
+
+# Uma linha de log por imagem (lento em lotes grandes). Ative com VERBOSE_MODE=1
+VERBOSE_MODE = os.getenv("VERBOSE_MODE", "").lower() in ("1", "true")
+
+# Saída do Ultralytics a cada predição. Ative com SHOW_YOLO_OUTPUT=1
+SHOW_YOLO_OUTPUT = os.getenv("SHOW_YOLO_OUTPUT", "").lower() in ("1", "true")
+
 # =============================================================================
 # 🤖 MODELOS YOLOV8 DISPONÍVEIS
 # =============================================================================
@@ -71,6 +138,9 @@ CLASSES = [
 # =============================================================================
 # 🔧 CLASSE DE CONFIGURAÇÃO (NÃO ALTERE ESTA PARTE)
 # =============================================================================
+# Indica se os diretórios do projeto já foram criados neste processo
+_DIRS_READY = False
+
 class Config:
     """Configurações centralizadas do sistema."""
     
@@ -87,6 +157,20 @@ class Config:
     DEFAULT_MODEL = DEFAULT_MODEL
     DEFAULT_CONFIDENCE_THRESHOLD = DEFAULT_CONFIDENCE_THRESHOLD
     DEFAULT_IOU_THRESHOLD = DEFAULT_IOU_THRESHOLD
+    DEFAULT_IMAGE_SIZE = DEFAULT_IMAGE_SIZE
+    
+    # Aceleração TensorRT
+    USE_TENSORRT_ENGINE = USE_TENSORRT_ENGINE
+    TENSORRT_MAX_BATCH_SIZE = TENSORRT_MAX_BATCH_SIZE
+    TENSORRT_PRECISION = TENSORRT_PRECISION
+    INT8_CALIBRATION_DATA = INT8_CALIBRATION_DATA
+    INT8_CALIBRATION_IMAGES = INT8_CALIBRATION_IMAGES
+    TENSORRT_WORKSPACE_GB = TENSORRT_WORKSPACE_GB
+    USE_TORCH_COMPILE = USE_TORCH_COMPILE
+    CUDA_EMPTY_CACHE_EVERY = CUDA_EMPTY_CACHE_EVERY
+    WARMUP_RUNS = WARMUP_RUNS
+    CPU_COUNT = CPU_COUNT
+    CPU_THREADS = CPU_THREADS
     
     # Modelos e extensões
     AVAILABLE_PRETRAINED_MODELS = AVAILABLE_PRETRAINED_MODELS
@@ -94,14 +178,24 @@ class Config:
     
     # Configurações de saída
     SAVE_ANNOTATED_IMAGES = True
+    ANNOTATED_JPEG_QUALITY = ANNOTATED_JPEG_QUALITY
+    RETURN_ANNOTATED_BYTES = RETURN_ANNOTATED_BYTES
     SAVE_JSON_RESULTS = True
-    
-    def __init__(self):
-        """Inicializa e cria diretórios necessários."""
-        self.ensure_directories()
+    PRETTY_JSON_OUTPUT = PRETTY_JSON_OUTPUT
+    VERBOSE_MODE = VERBOSE_MODE
+    SHOW_YOLO_OUTPUT = SHOW_YOLO_OUTPUT
     
     def ensure_directories(self):
-        """Garante que todos os diretórios necessários existam."""
+        """
+        Garante que todos os diretórios necessários existam.
+        
+        Os diretórios são criados uma única vez por processo; chamadas
+        seguintes não fazem nenhuma operação de disco.
+        """
+        global _DIRS_READY
+        if _DIRS_READY:
+            return
+        
         directories = [
             self.INFERENCE_DATA_DIR,
             self.PRETRAINED_MODELS_DIR,
@@ -111,20 +205,25 @@ class Config:
         
         for directory in directories:
             directory.mkdir(parents=True, exist_ok=True)
+        
+        _DIRS_READY = True
     
     def get_available_local_models(self):
         """Retorna lista de modelos disponíveis localmente."""
         models = []
         
-        # Verifica modelos pré-treinados
-        if self.PRETRAINED_MODELS_DIR.exists():
-            models.extend(list(self.PRETRAINED_MODELS_DIR.glob("*.pt")))
-        
-        # Verifica modelos treinados
-        if self.TRAINED_MODELS_DIR.exists():
-            models.extend(list(self.TRAINED_MODELS_DIR.glob("*.pt")))
+        # Verifica modelos pré-treinados e treinados (uma passada por pasta)
+        for directory in (self.PRETRAINED_MODELS_DIR, self.TRAINED_MODELS_DIR):
+            try:
+                with os.scandir(directory) as entries:
+                    models.extend(
+                        entry.path for entry in entries
+                        if entry.name.endswith(".pt") and entry.is_file()
+                    )
+            except OSError:
+                continue
         
-        return [str(model) for model in models]
+        return models
     
     def get_model_path(self, model_name: str):
         """
@@ -136,8 +235,6 @@ class Config:
         Returns:
             Caminho para o modelo local ou nome para download
         """
-        import os
-        
         # Verifica se é um caminho absoluto
         if os.path.isabs(model_name):
             return model_name
@@ -154,6 +251,28 @@ class Config:
         
         # Se não encontrou local, retorna apenas o nome (para download automático)
         return model_name
+    
+    def get_engine_path(self, model_path: str, precision: str = "fp16"):
+        """
+        Retorna o caminho do engine TensorRT correspondente a um modelo .pt.
+        
+        O nome inclui o mtime dos pesos: substituir o .pt gera um novo caminho,
+        e o engine exportado dos pesos antigos deixa de ser reutilizado.
+        
+        Args:
+            model_path: Caminho do modelo .pt
+            precision: Precisão do engine ("fp16" ou "int8")
+            
+        Returns:
+            Caminho do arquivo .engine salvo ao lado do .pt
+        """
+        model_path = Path(model_path)
+        suffix = "_int8" if precision == "int8" else ""
+        try:
+            suffix += f"_{model_path.stat().st_mtime_ns:x}"
+        except OSError:
+            pass  # Pesos fora do disco (ex.: nome de modelo oficial): caminho sem versão
+        return str(model_path.with_name(f"{model_path.stem}{suffix}.engine"))
 
 # Instância global da configuração
 config = Config()
@@ -8,27 +8,199 @@ Controlador especializado para processamento e otimização de imagens para mode
 import cv2
 import os
 import numpy as np
-from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
-from PIL import Image, ImageOps
-import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Optional, Callable, Iterator
+from PIL import Image, features
+
+from config.settings import config
+from utils.prefetch import iter_in_background
+
+# Motivos de otimização (bits combináveis)
+REASON_LARGE_FILE = 1
+REASON_HIGH_RESOLUTION = 2
+REASON_UNOPTIMIZED_FORMAT = 4
+
+# Extensões sem compressão eficiente
+UNOPTIMIZED_FORMATS = frozenset({'.bmp', '.tiff'})
+
+# A partir deste número de imagens o laço compilado pelo Numba compensa o JIT;
+# abaixo disso (o caso comum) a versão em NumPy é mais rápida já na 1ª chamada
+NUMBA_MIN_IMAGES = 100_000
+
+# Laço compilado sob demanda (None = ainda não compilado, False = numba indisponível)
+_NUMBA_CODES_KERNEL = None
+
+
+def _needs_optimization_codes_numpy(widths: np.ndarray, heights: np.ndarray,
+                                    file_sizes_mb: np.ndarray, unoptimized_format: np.ndarray) -> np.ndarray:
+    """Calcula os motivos de otimização de todas as imagens de uma vez (bits REASON_*)."""
+    codes = np.zeros(widths.size, dtype=np.uint8)
+    codes[file_sizes_mb > 5.0] |= REASON_LARGE_FILE
+    codes[(widths > 2000) | (heights > 2000)] |= REASON_HIGH_RESOLUTION
+    codes[unoptimized_format] |= REASON_UNOPTIMIZED_FORMAT
+    return codes
+
+
+def _needs_optimization_codes_loop(widths, heights, file_sizes_mb, unoptimized_format):
+    """Mesma regra de _needs_optimization_codes_numpy em um único laço (compilado pelo Numba)."""
+    codes = np.zeros(widths.size, dtype=np.uint8)
+    for i in range(widths.size):
+        code = 0
+        if file_sizes_mb[i] > 5.0:
+            code |= REASON_LARGE_FILE
+        if widths[i] > 2000 or heights[i] > 2000:
+            code |= REASON_HIGH_RESOLUTION
+        if unoptimized_format[i]:
+            code |= REASON_UNOPTIMIZED_FORMAT
+        codes[i] = code
+    return codes
+
+
+def _numba_codes_kernel():
+    """Importa o numba e compila (uma única vez) o laço; None se o numba não estiver instalado."""
+    global _NUMBA_CODES_KERNEL
+    if _NUMBA_CODES_KERNEL is None:
+        try:
+            from numba import njit
+        except ImportError:  # numba é opcional
+            _NUMBA_CODES_KERNEL = False
+        else:
+            # Sem cache=True: o sistema de arquivos do Lambda é somente leitura
+            _NUMBA_CODES_KERNEL = njit(_needs_optimization_codes_loop)
+    return _NUMBA_CODES_KERNEL or None
+
+
+def needs_optimization_codes(widths: np.ndarray, heights: np.ndarray,
+                             file_sizes_mb: np.ndarray, unoptimized_format: np.ndarray) -> np.ndarray:
+    """
+    Calcula os motivos de otimização (bits REASON_*) de cada imagem.
+    
+    Usa a versão em NumPy; o laço do Numba só é importado e compilado
+    para lotes com pelo menos NUMBA_MIN_IMAGES imagens.
+    
+    Args:
+        widths: Largura de cada imagem
+        heights: Altura de cada imagem
+        file_sizes_mb: Tamanho de cada arquivo em MB
+        unoptimized_format: Se a extensão de cada imagem está em UNOPTIMIZED_FORMATS
+            
+    Returns:
+        Array uint8 com os bits REASON_* de cada imagem
+    """
+    if widths.size >= NUMBA_MIN_IMAGES:
+        kernel = _numba_codes_kernel()
+        if kernel is not None:
+            return kernel(widths, heights, file_sizes_mb, unoptimized_format)
+    return _needs_optimization_codes_numpy(widths, heights, file_sizes_mb, unoptimized_format)
+
+
+@lru_cache(maxsize=64)
+def resized_shape(width: int, height: int, max_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Calcula o tamanho (largura, altura) de redução mantendo o aspect ratio.
+    
+    Datasets costumam ter poucas resoluções distintas (ex: 4000x3000 → 1920),
+    então o resultado é memorizado por (largura, altura, max_size).
+    
+    Returns:
+        Novo tamanho ou None quando a imagem já cabe em max_size
+    """
+    scale = min(max_size / width, max_size / height)
+    if scale >= 1:  # Só redimensiona se for reduzir
+        return None
+    return int(width * scale), int(height * scale)
+
+
+def _optimize_image_worker(image_path: str, output_dir: str, jpeg_params: List[int]) -> str:
+    """
+    Otimiza uma imagem e grava o JPEG no diretório de saída.
+    
+    Função de módulo com argumentos explícitos: o ProcessPoolExecutor envia só
+    o caminho e os parâmetros a cada processo, sem serializar o controlador.
+    
+    Args:
+        image_path: Caminho da imagem original
+        output_dir: Diretório de saída
+        jpeg_params: Parâmetros de gravação do cv2.imwrite
+            
+    Returns:
+        Caminho da imagem otimizada
+    """
+    img = ImageController.load_optimized_image(image_path)
+    if img is None:
+        raise ValueError("não foi possível ler a imagem")
+    
+    original_name = os.path.splitext(os.path.basename(image_path))[0]
+    output_path = os.path.join(output_dir, f"{original_name}_optimized.jpg")
+    
+    # Salva (arquivo intermediário: encode rápido por padrão)
+    if not cv2.imwrite(output_path, img, jpeg_params):
+        raise IOError(f"falha ao gravar {output_path}")
+    
+    return output_path
+
+
+def _resize_image_worker(image_path: str, output_dir: str, target_size: int) -> str:
+    """
+    Redimensiona uma imagem mantendo aspect ratio e grava o JPEG.
+    
+    Args:
+        image_path: Caminho da imagem original
+        output_dir: Diretório de saída
+        target_size: Maior dimensão da imagem redimensionada
+            
+    Returns:
+        Caminho da imagem redimensionada
+    """
+    img = ImageController._imread_reduced(image_path, max_size=target_size)
+    if img is None:
+        raise ValueError("não foi possível ler a imagem")
+    
+    img = ImageController._smart_resize(img, max_size=target_size)
+    
+    original_name = os.path.splitext(os.path.basename(image_path))[0]
+    output_path = os.path.join(output_dir, f"{original_name}_resized.jpg")
+    
+    if not cv2.imwrite(output_path, img, [cv2.IMWRITE_JPEG_QUALITY, 90]):
+        raise IOError(f"falha ao gravar {output_path}")
+    
+    return output_path
+
+
+def has_libjpeg_turbo() -> bool:
+    """Verifica se o Pillow foi compilado com libjpeg-turbo (decode/encode JPEG com SIMD)."""
+    try:
+        return bool(features.check_feature('libjpeg_turbo'))
+    except Exception:
+        return False
 
 
 class ImageController:
     """Controlador para processamento e otimização de imagens para YOLO."""
     
-    def __init__(self, target_size: int = 640, quality: int = 95):
+    def __init__(self, target_size: int = 640, quality: int = 95, max_workers: Optional[int] = None,
+                 optimize_jpeg: bool = False, progressive_jpeg: bool = False):
         """
         Inicializa o controlador de imagens.
         
         Args:
             target_size: Tamanho alvo para redimensionamento (YOLO usa 640x640)
             quality: Qualidade de compressão para salvamento (1-100)
+            max_workers: Processos para otimizar/redimensionar em paralelo (padrão: nº de CPUs)
+            optimize_jpeg: Otimiza as tabelas Huffman (arquivo menor, encode mais lento)
+            progressive_jpeg: Grava JPEG progressivo (encode mais lento)
         """
         self.target_size = target_size
         self.quality = quality
+        self.optimize_jpeg = optimize_jpeg
+        self.progressive_jpeg = progressive_jpeg
+        self.max_workers = max_workers or os.cpu_count() or 1
         self.valid_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
         
+        # Cabeçalhos já lidos, chaveados por (caminho, mtime) para reaproveitar entre etapas
+        self._scan_cache: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        
     def validate_and_filter_images(self, image_paths: List[str]) -> List[str]:
         """
         Valida e filtra imagens válidas para processamento YOLO.
@@ -43,11 +215,11 @@ class ImageController:
         
         print("🔍 Validando imagens para YOLO...")
         
-        for img_path in image_paths:
-            if self._is_valid_for_yolo(img_path):
-                valid_images.append(img_path)
+        for record in self._scan_images(image_paths):
+            if self._is_valid_record(record):
+                valid_images.append(record['path'])
             else:
-                print(f"⚠️  Ignorando: {Path(img_path).name}")
+                print(f"⚠️  Ignorando: {os.path.basename(record['path'])}")
         
         print(f"✅ {len(valid_images)} imagens válidas de {len(image_paths)} total")
         return valid_images
@@ -64,23 +236,14 @@ class ImageController:
         Returns:
             Lista de caminhos das imagens otimizadas
         """
-        output_path = Path(output_dir)
-        output_path.mkdir(exist_ok=True, parents=True)
-        
-        optimized_paths = []
+        # String pura: os workers montam os caminhos sem alocar Path por imagem
+        output_dir = os.fspath(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
         
         print(f"🖼️  Otimizando {len(image_paths)} imagens para YOLO...")
         
-        for i, img_path in enumerate(image_paths, 1):
-            try:
-                print(f"   📷 ({i}/{len(image_paths)}) {Path(img_path).name}")
-                
-                optimized_path = self._optimize_single_image(img_path, output_path)
-                if optimized_path:
-                    optimized_paths.append(optimized_path)
-                    
-            except Exception as e:
-                print(f"   ❌ Erro: {e}")
+        optimized_paths = self._process_in_parallel(_optimize_image_worker, image_paths, output_dir,
+                                                    self._jpeg_params())
         
         print(f"✅ {len(optimized_paths)} imagens otimizadas salvas em: {output_dir}")
         return optimized_paths
@@ -95,8 +258,9 @@ class ImageController:
         Returns:
             Análise das propriedades das imagens
         """
+        total = len(image_paths)
         analysis = {
-            'total_images': len(image_paths),
+            'total_images': total,
             'sizes': [],
             'formats': {},
             'resolutions': [],
@@ -104,43 +268,77 @@ class ImageController:
             'needs_optimization': []
         }
         
-        for img_path in image_paths:
-            try:
-                # Análise básica do arquivo
-                path_obj = Path(img_path)
-                file_size_mb = path_obj.stat().st_size / (1024 * 1024)
-                analysis['file_sizes_mb'].append(file_size_mb)
-                
-                # Formato
-                ext = path_obj.suffix.lower()
-                analysis['formats'][ext] = analysis['formats'].get(ext, 0) + 1
-                
-                # Dimensões da imagem
-                with Image.open(img_path) as img:
-                    width, height = img.size
-                    analysis['resolutions'].append((width, height))
-                    analysis['sizes'].append(width * height)
-                    
-                    # Verifica se precisa otimização
-                    needs_opt = self._needs_optimization(img_path, width, height, file_size_mb)
-                    if needs_opt:
-                        analysis['needs_optimization'].append({
-                            'path': img_path,
-                            'reason': needs_opt,
-                            'size': f"{width}x{height}",
-                            'file_size_mb': round(file_size_mb, 2)
-                        })
-                        
-            except Exception as e:
-                print(f"⚠️  Erro ao analisar {img_path}: {e}")
+        # Arrays pré-alocados: preenchidos por índice e reduzidos de uma vez no final
+        file_sizes_mb = np.empty(total, dtype=np.float64)
+        widths = np.empty(total, dtype=np.int64)
+        heights = np.empty(total, dtype=np.int64)
+        image_sizes_mb = np.empty(total, dtype=np.float64)
+        unoptimized_format = np.empty(total, dtype=np.bool_)
+        image_records = []
+        n_files = 0
+        n_images = 0
+        
+        # Reaproveita os cabeçalhos lidos na validação (uma abertura por arquivo)
+        for record in self._scan_images(image_paths):
+            img_path = record['path']
+            
+            if record['size_bytes'] is None:
+                print(f"⚠️  Erro ao analisar {img_path}: {record['error']}")
+                continue
+            
+            # Análise básica do arquivo
+            file_size_mb = record['size_bytes'] / (1024 * 1024)
+            file_sizes_mb[n_files] = file_size_mb
+            n_files += 1
+            
+            # Formato
+            ext = record['ext']
+            analysis['formats'][ext] = analysis['formats'].get(ext, 0) + 1
+            
+            if record['width'] is None:
+                print(f"⚠️  Erro ao analisar {img_path}: {record['error']}")
+                continue
+            
+            # Dimensões da imagem
+            width, height = record['width'], record['height']
+            widths[n_images] = width
+            heights[n_images] = height
+            image_sizes_mb[n_images] = file_size_mb
+            unoptimized_format[n_images] = ext in UNOPTIMIZED_FORMATS
+            image_records.append(record)
+            n_images += 1
+        
+        file_sizes_mb = file_sizes_mb[:n_files]
+        widths = widths[:n_images]
+        heights = heights[:n_images]
+        image_sizes_mb = image_sizes_mb[:n_images]
+        sizes = widths * heights
+        
+        # Verifica quais imagens precisam de otimização em uma única passada
+        codes = needs_optimization_codes(widths, heights, image_sizes_mb, unoptimized_format[:n_images])
+        
+        # Descrições legíveis apenas para as imagens marcadas
+        for i in np.flatnonzero(codes):
+            record = image_records[i]
+            width, height, file_size_mb = int(widths[i]), int(heights[i]), float(image_sizes_mb[i])
+            analysis['needs_optimization'].append({
+                'path': record['path'],
+                'reason': self._describe_optimization_reasons(codes[i], record['ext'], width, height, file_size_mb),
+                'size': f"{width}x{height}",
+                'file_size_mb': round(file_size_mb, 2)
+            })
+        
+        analysis['file_sizes_mb'] = file_sizes_mb.tolist()
+        analysis['resolutions'] = list(zip(widths.tolist(), heights.tolist()))
+        analysis['sizes'] = sizes.tolist()
         
         # Estatísticas
-        if analysis['file_sizes_mb']:
-            analysis['avg_file_size_mb'] = sum(analysis['file_sizes_mb']) / len(analysis['file_sizes_mb'])
-            analysis['max_file_size_mb'] = max(analysis['file_sizes_mb'])
+        if n_files:
+            analysis['avg_file_size_mb'] = float(file_sizes_mb.mean())
+            analysis['max_file_size_mb'] = float(file_sizes_mb.max())
             
-        if analysis['sizes']:
-            analysis['avg_resolution'] = int(np.sqrt(sum(analysis['sizes']) / len(analysis['sizes'])))
+        if n_images:
+            analysis['avg_resolution'] = int(np.sqrt(sizes.mean()))
             
         return analysis
     
@@ -156,25 +354,55 @@ class ImageController:
         Returns:
             Lista de caminhos das imagens redimensionadas
         """
-        output_path = Path(output_dir)
-        output_path.mkdir(exist_ok=True, parents=True)
-        
-        resized_paths = []
+        output_dir = os.fspath(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
         
         print(f"📐 Redimensionando {len(image_paths)} imagens...")
         
-        for i, img_path in enumerate(image_paths, 1):
+        return self._process_in_parallel(_resize_image_worker, image_paths, output_dir, self.target_size)
+    
+    def _process_in_parallel(self, worker: Callable[..., str], image_paths: List[str],
+                             output_dir: str, *worker_args) -> List[str]:
+        """
+        Aplica uma função de processamento às imagens usando vários processos.
+        
+        Decode/encode JPEG ocupam a CPU; cada imagem vira uma tarefa no pool.
+        O worker é uma função de módulo e recebe só argumentos simples, então
+        nada do controlador é serializado. Uma imagem com erro é reportada e
+        ignorada sem interromper as demais. A ordem segue a de image_paths.
+        
+        Args:
+            worker: Função (caminho, diretório de saída, *worker_args) → caminho gerado
+            image_paths: Lista de caminhos das imagens
+            output_dir: Diretório de saída
+            *worker_args: Argumentos extras repassados ao worker
+            
+        Returns:
+            Lista de caminhos gerados com sucesso
+        """
+        workers = min(self.max_workers, len(image_paths))
+        processed_paths = []
+        
+        def report(i: int, img_path: str, run_task: Callable[[], str]):
+            # Uma linha por imagem só no modo verboso; erros são sempre exibidos
+            if config.VERBOSE_MODE:
+                print(f"   📷 ({i}/{len(image_paths)}) {os.path.basename(img_path)}")
             try:
-                print(f"   📷 ({i}/{len(image_paths)}) {Path(img_path).name}")
-                
-                resized_path = self._resize_single_image(img_path, output_path)
-                if resized_path:
-                    resized_paths.append(resized_path)
-                    
+                processed_paths.append(run_task())
             except Exception as e:
-                print(f"   ❌ Erro: {e}")
+                print(f"      ❌ Erro em {os.path.basename(img_path)}: {e}")
+        
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(worker, img_path, output_dir, *worker_args)
+                           for img_path in image_paths]
+                for i, (img_path, future) in enumerate(zip(image_paths, futures), 1):
+                    report(i, img_path, future.result)
+        else:
+            for i, img_path in enumerate(image_paths, 1):
+                report(i, img_path, lambda: worker(img_path, output_dir, *worker_args))
         
-        return resized_paths
+        return processed_paths
     
     def create_optimization_report(self, original_paths: List[str], 
                                  optimized_paths: List[str]) -> Dict[str, Any]:
@@ -198,8 +426,8 @@ class ImageController:
         }
         
         # Calcula economia de espaço
-        original_size = sum(Path(p).stat().st_size for p in original_paths if Path(p).exists())
-        optimized_size = sum(Path(p).stat().st_size for p in optimized_paths if Path(p).exists())
+        original_size = self._total_size(original_paths)
+        optimized_size = self._total_size(optimized_paths)
         
         report['space_saved_mb'] = (original_size - optimized_size) / (1024 * 1024)
         report['average_compression_ratio'] = (1 - optimized_size / original_size) * 100 if original_size > 0 else 0
@@ -216,123 +444,255 @@ class ImageController:
         
         return report
     
+    @staticmethod
+    def _total_size(paths: List[str]) -> int:
+        """Soma o tamanho em bytes dos arquivos com um único os.stat por caminho."""
+        total = 0
+        for path in paths:
+            try:
+                total += os.stat(path).st_size
+            except OSError:
+                pass
+        return total
+    
     def _is_valid_for_yolo(self, image_path: str) -> bool:
         """Verifica se uma imagem é válida para YOLO."""
-        try:
-            if not os.path.exists(image_path):
-                return False
-            
-            # Verifica extensão
-            if Path(image_path).suffix.lower() not in self.valid_extensions:
-                return False
-            
-            # Verifica se pode abrir a imagem
-            with Image.open(image_path) as img:
-                width, height = img.size
-                
-                # YOLO requer imagens com pelo menos 32x32 pixels
-                if width < 32 or height < 32:
-                    return False
-                
-                # Verifica se não é muito grande (>32MP pode causar problemas)
-                if width * height > 32_000_000:
-                    return False
-            
-            return True
-            
-        except Exception:
+        return self._is_valid_record(self._scan_images([image_path])[0])
+    
+    def _is_valid_record(self, record: Dict[str, Any]) -> bool:
+        """Verifica se o cabeçalho lido de uma imagem é válido para YOLO."""
+        # Verifica extensão
+        if record['ext'] not in self.valid_extensions:
             return False
+        
+        # Verifica se o arquivo existe e pôde ser aberto
+        if record['width'] is None:
+            return False
+        
+        width, height = record['width'], record['height']
+        
+        # YOLO requer imagens com pelo menos 32x32 pixels
+        if width < 32 or height < 32:
+            return False
+        
+        # Verifica se não é muito grande (>32MP pode causar problemas)
+        if width * height > 32_000_000:
+            return False
+        
+        return True
+    
+    def _scan_images(self, image_paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        Lê tamanho, formato e dimensões de cada imagem abrindo o arquivo uma única vez.
+        
+        Os resultados ficam em cache por (caminho, mtime), então validação e
+        análise das mesmas imagens não repetem a leitura. Listas grandes são
+        lidas em threads, já que stat e leitura de cabeçalho liberam o GIL.
+        """
+        if len(image_paths) < 64:
+            return [self._scan_image(img_path) for img_path in image_paths]
+        
+        workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._scan_image, image_paths))
     
-    def _optimize_single_image(self, image_path: str, output_dir: Path) -> Optional[str]:
-        """Otimiza uma única imagem."""
+    def _scan_image(self, img_path: str) -> Dict[str, Any]:
+        """Lê (ou recupera do cache) o registro de uma única imagem."""
         try:
-            with Image.open(image_path) as img:
-                # Converte para RGB se necessário
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Corrige orientação baseada em EXIF
-                img = ImageOps.exif_transpose(img)
-                
-                original_size = img.size
-                
-                # Redimensiona se muito grande
-                if max(original_size) > 2000:  # Redimensiona imagens > 2000px
-                    img = self._smart_resize(img, max_size=1920)
-                
-                # Nome do arquivo otimizado
-                original_name = Path(image_path).stem
-                output_path = output_dir / f"{original_name}_optimized.jpg"
-                
-                # Salva com otimização
-                img.save(
-                    output_path,
-                    'JPEG',
-                    quality=self.quality,
-                    optimize=True,
-                    progressive=True
-                )
-                
-                return str(output_path)
-                
-        except Exception as e:
-            print(f"      ❌ Erro ao otimizar: {e}")
-            return None
+            stat = os.stat(img_path)
+        except OSError as e:
+            return self._empty_record(img_path, str(e))
+        
+        key = (img_path, stat.st_mtime_ns)
+        record = self._scan_cache.get(key)
+        if record is None:
+            record = self._read_image_header(img_path, stat.st_size)
+            self._scan_cache[key] = record
+        return record
     
-    def _resize_single_image(self, image_path: str, output_dir: Path) -> Optional[str]:
-        """Redimensiona uma única imagem mantendo aspect ratio."""
+    def _read_image_header(self, image_path: str, size_bytes: int) -> Dict[str, Any]:
+        """Abre a imagem lendo apenas o cabeçalho (sem decodificar os pixels)."""
+        record = self._empty_record(image_path)
+        record['size_bytes'] = size_bytes
+        
         try:
             with Image.open(image_path) as img:
-                # Converte para RGB
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Redimensiona mantendo proporção
-                img = self._smart_resize(img, max_size=self.target_size)
-                
-                # Nome do arquivo redimensionado
-                original_name = Path(image_path).stem
-                output_path = output_dir / f"{original_name}_resized.jpg"
-                
-                # Salva
-                img.save(output_path, 'JPEG', quality=90)
-                
-                return str(output_path)
-                
+                record['width'], record['height'] = img.size
+                record['format'] = img.format
         except Exception as e:
-            print(f"      ❌ Erro ao redimensionar: {e}")
+            record['error'] = str(e)
+        
+        return record
+    
+    @staticmethod
+    def _empty_record(image_path: str, error: Optional[str] = None) -> Dict[str, Any]:
+        """Cria o registro de uma imagem ainda não lida."""
+        return {
+            'path': image_path,
+            'ext': os.path.splitext(image_path)[1].lower(),
+            'size_bytes': None,
+            'width': None,
+            'height': None,
+            'format': None,
+            'error': error
+        }
+    
+    @staticmethod
+    def load_optimized_image(image_path: str) -> Optional[np.ndarray]:
+        """
+        Decodifica e otimiza uma imagem em memória, sem gravar em disco.
+        
+        Args:
+            image_path: Caminho da imagem
+            
+        Returns:
+            Imagem BGR (uint8) pronta para o YOLO ou None se não puder ser lida
+        """
+        # Maior dimensão original (cabeçalho): a redução no decode pode entregar
+        # imagens > 2000px já entre 1920 e 2000px
+        largest = ImageController._header_largest(image_path)
+        
+        # Lê em BGR de 3 canais (orientação EXIF já é aplicada pelo OpenCV)
+        img = ImageController._imread_reduced(image_path, max_size=1920, min_size_to_reduce=2000,
+                                              largest=largest)
+        if img is None:
             return None
+        
+        # Redimensiona se muito grande (imagens originais > 2000px)
+        if (largest or max(img.shape[:2])) > 2000:
+            img = ImageController._smart_resize(img, max_size=1920)
+        
+        return img
     
-    def _smart_resize(self, img: Image.Image, max_size: int) -> Image.Image:
-        """Redimensiona imagem mantendo aspect ratio."""
-        width, height = img.size
+    def optimize_images_in_memory(self, image_paths: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Otimiza imagens em memória para entrega direta ao YOLO.
+        
+        Evita o ciclo encode JPEG → disco → decode quando o destino é a inferência.
+        O OpenCV libera o GIL durante decode/resize, então threads bastam.
+        
+        Args:
+            image_paths: Lista de caminhos das imagens
+            
+        Returns:
+            Lista de imagens BGR (ou None nas que falharam), na ordem de image_paths
+        """
+        workers = max(1, min(self.max_workers, len(image_paths)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.load_optimized_image, image_paths))
+    
+    def iter_optimized_batches(self, image_paths: List[str],
+                               batch_size: int = 16) -> Iterator[List[Tuple[str, Optional[np.ndarray]]]]:
+        """
+        Gera lotes de imagens otimizadas em memória, preparados em segundo plano.
+        
+        Uma thread produtora decodifica/redimensiona os próximos lotes enquanto
+        o consumidor (inferência) processa o lote atual. A fila limitada controla
+        quantos lotes ficam em memória; erros da produção são relançados no consumidor.
+        
+        Args:
+            image_paths: Lista de caminhos das imagens
+            batch_size: Quantidade de imagens por lote
+            
+        Returns:
+            Iterador de lotes com tuplas (caminho, imagem BGR ou None)
+        """
+        def optimize_batches():
+            # Um único pool para todos os lotes (sem recriar threads a cada lote)
+            workers = max(1, min(self.max_workers, batch_size))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for start in range(0, len(image_paths), batch_size):
+                    chunk = image_paths[start:start + batch_size]
+                    yield list(zip(chunk, executor.map(self.load_optimized_image, chunk)))
+        
+        return iter_in_background(optimize_batches(), maxsize=2)
+    
+    def _jpeg_params(self) -> List[int]:
+        """Parâmetros de gravação JPEG das imagens otimizadas."""
+        params = [
+            cv2.IMWRITE_JPEG_QUALITY, self.quality,
+            cv2.IMWRITE_JPEG_OPTIMIZE, int(self.optimize_jpeg),
+            cv2.IMWRITE_JPEG_PROGRESSIVE, int(self.progressive_jpeg)
+        ]
+        
+        # Subamostragem de croma 4:2:0 explícita (OpenCV >= 4.5.5)
+        if hasattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR'):
+            params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420]
+        
+        return params
+    
+    @staticmethod
+    def _header_largest(image_path: str) -> int:
+        """Maior dimensão da imagem lida apenas do cabeçalho (0 se não puder ser lida)."""
+        try:
+            with Image.open(image_path) as header:
+                return max(header.size)
+        except Exception:
+            return 0
+    
+    @staticmethod
+    def _imread_reduced(image_path: str, max_size: int, min_size_to_reduce: int = 0,
+                        largest: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Lê uma imagem deixando o libjpeg reduzir a escala durante o decode.
+        
+        Para JPEGs bem maiores que max_size, o IDCT já gera a imagem em 1/2, 1/4
+        ou 1/8 da resolução, sem nunca ficar abaixo de max_size; o resize final
+        só fecha a diferença restante.
         
-        # Calcula o fator de escala
-        scale = min(max_size / width, max_size / height)
+        Args:
+            image_path: Caminho da imagem
+            max_size: Maior dimensão desejada após o resize
+            min_size_to_reduce: Só reduz imagens cuja maior dimensão passe deste valor
+            largest: Maior dimensão original já lida do cabeçalho (None = lê aqui)
+            
+        Returns:
+            Imagem BGR (uint8) ou None se não puder ser lida
+        """
+        flag = cv2.IMREAD_COLOR
+        
+        if os.path.splitext(image_path)[1].lower() in ('.jpg', '.jpeg'):
+            if largest is None:
+                largest = ImageController._header_largest(image_path)
+            
+            if largest > max(max_size, min_size_to_reduce):
+                for factor, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                                             (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                             (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                    if largest // factor >= max_size:
+                        flag = reduced_flag
+                        break
+        
+        return cv2.imread(image_path, flag)
+    
+    @staticmethod
+    def _smart_resize(img: np.ndarray, max_size: int) -> np.ndarray:
+        """Redimensiona imagem mantendo aspect ratio."""
+        height, width = img.shape[:2]
         
-        if scale < 1:  # Só redimensiona se for reduzir
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        new_size = resized_shape(width, height, max_size)
+        if new_size is not None:
+            # INTER_AREA é o melhor interpolador do OpenCV para redução
+            img = cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
         
         return img
     
-    def _needs_optimization(self, image_path: str, width: int, height: int, 
-                           file_size_mb: float) -> Optional[str]:
-        """Verifica se uma imagem precisa de otimização."""
+    @staticmethod
+    def _describe_optimization_reasons(code: int, ext: str, width: int, height: int,
+                                       file_size_mb: float) -> Optional[str]:
+        """Converte os bits REASON_* em uma descrição legível."""
         reasons = []
         
         # Tamanho de arquivo muito grande
-        if file_size_mb > 5:
+        if code & REASON_LARGE_FILE:
             reasons.append(f"arquivo grande ({file_size_mb:.1f}MB)")
         
         # Resolução muito alta
-        if width > 2000 or height > 2000:
+        if code & REASON_HIGH_RESOLUTION:
             reasons.append(f"alta resolução ({width}x{height})")
         
         # Formato não otimizado
-        ext = Path(image_path).suffix.lower()
-        if ext in ['.bmp', '.tiff']:
+        if code & REASON_UNOPTIMIZED_FORMAT:
             reasons.append(f"formato não otimizado ({ext})")
         
         return ", ".join(reasons) if reasons else None
@@ -359,7 +719,7 @@ class ImageController:
         if analysis['needs_optimization']:
             print(f"\n⚠️  Imagens que precisam otimização ({len(analysis['needs_optimization'])}):")
             for img_info in analysis['needs_optimization'][:5]:  # Mostra apenas as 5 primeiras
-                name = Path(img_info['path']).name
+                name = os.path.basename(img_info['path'])
                 print(f"   📷 {name}: {img_info['reason']}")
             
             if len(analysis['needs_optimization']) > 5:
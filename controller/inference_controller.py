@@ -5,46 +5,112 @@ YoloV8 Inference Controller
 Controller principal para orquestrar inferência YoloV8.
 """
 
-import json
+import gc
+import heapq
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List
+from threading import Lock
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
 
 from services.inference_service import YoloV8InferenceService
 from services.report_service import ReportService
 from utils.file_utils import FileUtils
-from utils.performance_utils import PerformanceUtils
+from utils.image_processor import ImageProcessor
+from utils.performance_utils import PerformanceAccumulator, PerformanceUtils
 from config.settings import config
 
+# Campos da resposta que não vão para o JSON Lines (arrays NumPy e JPEG em base64)
+REPORT_EXCLUDED_KEYS = frozenset({'detections_soa', 'annotated_jpeg'})
+
 
 class InferenceController:
     """Controller principal para inferência YoloV8."""
     
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, precision: str = None):
         """
         Inicializa o controller.
         
         Args:
             model_path: Caminho do modelo a usar
+            precision: Precisão do engine TensorRT ("fp32", "fp16" ou "int8")
         """
-        self.inference_service = YoloV8InferenceService(model_path)
+        config.ensure_directories()
+        self.inference_service = YoloV8InferenceService(model_path, precision)
         self.report_service = ReportService()
         
-    def run_single_image_inference(self, image_path: str, conf: float = 0.5) -> Dict[str, Any]:
+    def run_single_image_inference(self, image_path: Union[str, np.ndarray], conf: float = 0.5,
+                                   image_name: Optional[str] = None,
+                                   save_annotated: bool = True) -> Dict[str, Any]:
         """
         Executa inferência em uma única imagem.
         
         Args:
-            image_path: Caminho da imagem
+            image_path: Caminho da imagem ou imagem BGR (uint8) já decodificada
             conf: Threshold de confiança
+            image_name: Caminho/nome da imagem quando image_path é um array
+            save_annotated: Se deve desenhar e gravar a imagem anotada
             
         Returns:
             Resultado da inferência
         """
-        return self.inference_service.run_inference_on_image(image_path, conf)
+        return self.inference_service.run_inference_on_image(image_path, conf, image_name, save_annotated)
+    
+    def run_batch_inference(self, image_paths: List[str], conf: float = 0.5,
+                            batch_size: int = 16, save_annotated: bool = True) -> List[Dict[str, Any]]:
+        """
+        Executa inferência em lotes de imagens.
+        
+        Args:
+            image_paths: Lista de caminhos das imagens
+            conf: Threshold de confiança
+            batch_size: Quantidade de imagens por forward pass
+            save_annotated: Se deve desenhar e gravar as imagens anotadas
+            
+        Returns:
+            Lista de resultados, na mesma ordem de image_paths
+        """
+        return self.inference_service.run_batch_inference(image_paths, conf, batch_size, save_annotated)
+    
+    def run_batch_inference_on_arrays(self, images: List[Tuple[str, Optional[np.ndarray]]],
+                                      conf: float = 0.5, batch_size: int = 16,
+                                      save_annotated: bool = True) -> List[Dict[str, Any]]:
+        """
+        Executa inferência em lotes de imagens já decodificadas em memória.
+        
+        Args:
+            images: Tuplas (caminho de origem, imagem BGR ou None)
+            conf: Threshold de confiança
+            batch_size: Quantidade de imagens por forward pass
+            save_annotated: Se deve desenhar e gravar as imagens anotadas
+            
+        Returns:
+            Lista de resultados, na mesma ordem de images
+        """
+        return self.inference_service.run_batch_inference_on_arrays(images, conf, batch_size, save_annotated)
+    
+    def prefetch_batches(self, image_paths: List[str],
+                         batch_size: int = 16) -> Iterator[List[Tuple[str, Optional[np.ndarray]]]]:
+        """
+        Decodifica lotes de imagens em segundo plano, à frente da inferência.
+        
+        Args:
+            image_paths: Lista de caminhos das imagens
+            batch_size: Quantidade de imagens por lote
+            
+        Returns:
+            Iterador de lotes de tuplas (caminho, imagem BGR ou None)
+        """
+        return self.inference_service.prefetch_batches(image_paths, batch_size)
     
     def run_folder_inference(self, folder_path: str, conf: float = 0.5, 
-                           save_report: bool = True) -> Dict[str, Any]:
+                           save_report: bool = True, batch_size: int = 16,
+                           save_annotated: bool = True) -> Dict[str, Any]:
         """
         Executa inferência em uma pasta de imagens.
         
@@ -52,24 +118,42 @@ class InferenceController:
             folder_path: Caminho da pasta
             conf: Threshold de confiança
             save_report: Se deve salvar relatório
+            batch_size: Quantidade de imagens por forward pass
+            save_annotated: Se deve desenhar e gravar as imagens anotadas
             
         Returns:
             Dicionário com resultados e métricas
         """
-        # Executa inferência com medição de tempo
-        start_time = time.time()
-        results = self.inference_service.run_inference_on_folder(folder_path, conf)
-        total_time = time.time() - start_time
+        # Horário de referência da execução (capturado uma única vez)
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        
+        # Lê informações dos arquivos (IO de disco) em paralelo com a inferência
+        image_paths = FileUtils.find_images_in_folder(folder_path)
+        
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+            info_futures = {path: pool.submit(ImageProcessor.get_image_info, path) for path in image_paths}
+            
+            # Executa inferência com medição de tempo
+            results, total_time, _ = PerformanceUtils.time_function(
+                self.inference_service.run_inference_on_folder, folder_path, conf, batch_size, save_annotated
+            )
+            
+            for result in results:
+                future = info_futures.get(result['image_path'])
+                result['image_info'] = (future.result() if future 
+                                        else ImageProcessor.get_image_info(result['image_path']))
         
         # Gera relatório resumido
-        summary = self.report_service.generate_summary_report(results, self.inference_service.model_path)
+        summary = self.report_service.generate_summary_report(results, self.inference_service.model_path,
+                                                              self.inference_service.model.names)
         
         # Calcula métricas de performance
         performance_metrics = PerformanceUtils.calculate_performance_metrics(results, total_time)
+        print(f"📊 {PerformanceUtils.metrics_oneline(performance_metrics)}")
         
         # Salva relatório se solicitado
         if save_report and results:
-            self._save_detailed_report(results, summary, performance_metrics)
+            self._save_detailed_report(results, summary, performance_metrics, timestamp)
         
         return {
             'results': results,
@@ -78,6 +162,21 @@ class InferenceController:
             'model_used': self.inference_service.model_path
         }
     
+    def run_multi_stream(self, sources: List[str], conf: float = 0.5,
+                         max_frames: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Executa rastreamento em várias fontes de vídeo compartilhando o mesmo modelo.
+        
+        Args:
+            sources: URLs RTSP/HTTP, caminhos de vídeo ou índices de webcam
+            conf: Threshold de confiança
+            max_frames: Quantidade máxima de lotes de frames (None = até o fim)
+            
+        Returns:
+            Iterador com um resultado por frame
+        """
+        return self.inference_service.run_multi_source(sources, conf, max_frames)
+    
     def run_benchmark(self, test_image_path: str, runs: int = 3) -> Dict[str, Any]:
         """
         Executa benchmark do modelo atual.
@@ -94,52 +193,204 @@ class InferenceController:
         # Mede tempo de carregamento (já foi carregado, mas simula)
         load_time = 0.0  # Modelo já carregado
         
-        # Executa múltiplas inferências
-        inference_times = []
-        total_detections = 0
+        # Aquece antes de medir (a 1ª inferência inclui setup de GPU/cuDNN)
+        self.inference_service.warmup()
+        
+        # Executa múltiplas inferências (métricas acumuladas em fluxo)
+        accumulator = PerformanceAccumulator()
         
         for i in range(runs):
-            start_time = time.time()
-            result = self.inference_service.run_inference_on_image(test_image_path, conf=0.5)
-            inference_time = time.time() - start_time
+            # Imagem anotada não é usada no benchmark (evita desenho + encode JPEG)
+            result, inference_time, _ = PerformanceUtils.time_function(
+                self.inference_service.run_inference_on_image, test_image_path, conf=0.5, save_annotated=False
+            )
             
-            inference_times.append(inference_time)
-            total_detections += result.get('detections_count', 0)
+            accumulator.update(result.get('detections_count', 0), inference_time)
         
-        avg_inference_time = sum(inference_times) / len(inference_times)
-        avg_detections = total_detections / runs
+        metrics = accumulator.metrics()
+        avg_inference_time = metrics['average_time_per_image']
+        avg_detections = accumulator.total_detections / runs
         model_size = FileUtils.get_file_size_mb(self.inference_service.model_path)
         
         benchmark_results = {
             'model_name': Path(self.inference_service.model_path).name,
             'load_time': load_time,
             'avg_inference_time': avg_inference_time,
+            'std_inference_time': metrics['std_time_per_image'],
             'avg_detections': avg_detections,
             'model_size': model_size,
             'runs': runs
         }
         
-        # Imprime resultados
-        print(f"   ⏱️  Carregamento: {load_time:.2f}s")
-        print(f"   🚀 Inferência média: {avg_inference_time:.2f}s")
-        print(f"   🎯 Detecções médias: {avg_detections:.1f}")
-        print(f"   💾 Tamanho: {model_size:.1f}MB")
+        # Imprime resultados (uma única escrita por modelo)
+        print(f"   ⏱️  Carregamento: {load_time:.2f}s\n"
+              f"   🚀 Inferência média: {avg_inference_time:.2f}s\n"
+              f"   🎯 Detecções médias: {avg_detections:.1f}\n"
+              f"   💾 Tamanho: {model_size:.1f}MB\n"
+              f"   📊 {PerformanceUtils.metrics_oneline(metrics)}")
         
         return benchmark_results
+
+    def analyze_image_with_different_thresholds(self, image_path: str,
+                                                thresholds: Optional[List[float]] = None) -> Dict[str, Any]:
+        """
+        Analisa quantas detecções uma imagem tem em diferentes thresholds de confiança.
+
+        O threshold é apenas um filtro sobre a saída do modelo: a inferência
+        roda uma única vez no menor threshold e as contagens são obtidas na CPU.
+
+        Args:
+            image_path: Caminho da imagem
+            thresholds: Lista de thresholds de confiança a comparar
+
+        Returns:
+            Dicionário com as detecções e a contagem por threshold
+        """
+        thresholds = thresholds or [0.1, 0.25, 0.5, 0.75, 0.9]
+
+        result = self.inference_service.run_inference_on_image(image_path, conf=min(thresholds),
+                                                              save_annotated=False)
+        detections = result.get('detections', [])
+
+        # Matriz (detecções x thresholds) → contagem por coluna
+        soa = result.get('detections_soa')
+        confidences = (soa['confs'] if soa is not None else
+                       np.fromiter((d['confidence'] for d in detections), dtype=np.float32,
+                                   count=len(detections)))
+        counts = (confidences[:, None] >= np.asarray(thresholds, dtype=np.float32)).sum(axis=0)
+
+        print(f"🎚️  Análise de thresholds: {os.path.basename(image_path)}")
+        for threshold, count in zip(thresholds, counts):
+            print(f"   conf >= {threshold:.2f}: {int(count)} objetos")
+
+        # Top-3 sem ordenar todas as detecções
+        top_detections = heapq.nlargest(3, detections, key=lambda d: d['confidence'])
+        for detection in top_detections:
+            print(f"   🏆 {detection['class_name']}: {detection['confidence']:.2f}")
+
+        return {
+            'image_path': image_path,
+            'detections': detections,
+            'counts_by_threshold': {threshold: int(count) for threshold, count in zip(thresholds, counts)},
+            'top_detections': top_detections,
+            'error': result.get('error')
+        }
+
+    def run_multi_model_benchmark(self, model_paths: List[str], test_image_path: str,
+                                  runs: int = 3) -> Dict[str, Any]:
+        """
+        Executa benchmark de vários modelos reaproveitando o modelo carregado.
+        
+        Os pesos de cada modelo são trocados no wrapper YOLO já carregado;
+        quando a troca não é possível, um novo controller é criado.
+        
+        Args:
+            model_paths: Caminhos dos modelos a comparar
+            test_image_path: Caminho da imagem de teste
+            runs: Número de execuções por modelo
+            
+        Returns:
+            Dicionário com o benchmark de cada modelo ('benchmarks') e a
+            comparação entre eles ('comparison', ver PerformanceUtils.compare_models)
+        """
+        print("⚡ Benchmark de Múltiplos Modelos")
+        
+        original_model_path = self.inference_service.model_path
+        benchmarks = []
+        
+        try:
+            for model_path in model_paths:
+                if model_path == self.inference_service.model_path or self.inference_service.swap_weights(model_path):
+                    controller = self
+                else:
+                    controller = InferenceController(model_path)
+                
+                benchmarks.append(controller.run_benchmark(test_image_path, runs))
+        finally:
+            # Restaura os pesos originais mesmo após erro: este controller costuma
+            # estar no cache de get_controller, chaveado pelo modelo original
+            if self.inference_service.model_path != original_model_path:
+                if not self.inference_service.swap_weights(original_model_path):
+                    self.inference_service.model_path = original_model_path
+                    self.inference_service.load_model()
+        
+        comparison = PerformanceUtils.compare_models(benchmarks)
+        print(f"\n📊 Comparação de modelos:\n"
+              f"   🚀 Mais rápido: {comparison['fastest_model']}\n"
+              f"   🎯 Mais detecções: {comparison['most_detections_model']}\n"
+              f"   💾 Menor: {comparison['smallest_model']}")
+        for position, entry in enumerate(comparison['ranking'], 1):
+            print(f"   🏆 {position}. {entry['model']} (score {entry['performance_score']:.1f})")
+        
+        return {'benchmarks': benchmarks, 'comparison': comparison}
     
     def _save_detailed_report(self, results: List[Dict[str, Any]], 
                             summary: Dict[str, Any], 
-                            performance: Dict[str, Any]):
-        """Salva relatório detalhado em arquivo JSON."""
+                            performance: Dict[str, Any],
+                            timestamp: str = None):
+        """Salva relatório resumido em JSON e resultados detalhados em JSON Lines."""
+        # Um resultado por linha: consumidores podem ler o arquivo em streaming
+        results_file = config.OUTPUT_DIR / "inference_results.jsonl"
+        FileUtils.write_jsonl(results_file, (
+            {key: value for key, value in result.items() if key not in REPORT_EXCLUDED_KEYS}
+            for result in results
+        ))
+        
         report_data = {
             'summary': summary,
             'performance': performance,
-            'detailed_results': results,
-            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+            'detailed_results_file': results_file.name,
+            'timestamp': timestamp or time.strftime('%Y-%m-%d %H:%M:%S')
         }
         
         output_file = config.OUTPUT_DIR / "inference_report.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, indent=2, ensure_ascii=False)
+        with open(output_file, 'wb') as f:
+            f.write(FileUtils.dumps_json(report_data, config.PRETTY_JSON_OUTPUT))
         
         print(f"💾 Relatório salvo em: {output_file}")
+        print(f"💾 Resultados detalhados em: {results_file}")
+
+
+# Serializa a criação: duas threads pedindo o mesmo modelo não o carregam duas vezes
+_controller_lock = Lock()
+
+
+@lru_cache(maxsize=4)
+def _cached_controller(model_path: Optional[str], precision: Optional[str], device: str) -> InferenceController:
+    """Cria o controller de uma combinação (modelo, precisão, dispositivo)."""
+    return InferenceController(model_path, precision)
+
+
+def get_controller(model_path: str = None, precision: str = None) -> InferenceController:
+    """
+    Retorna um controller já carregado para o modelo informado.
+    
+    Controllers são reutilizados por (modelo, precisão, dispositivo), evitando
+    recarregar os pesos a cada chamada. O aquecimento fica a cargo de quem chama
+    (inference_service.warmup() só executa uma vez por modelo).
+    
+    Args:
+        model_path: Caminho do modelo a usar
+        precision: Precisão do engine TensorRT ("fp32", "fp16" ou "int8")
+        
+    Returns:
+        InferenceController com o modelo carregado
+    """
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    precision = precision.lower() if precision else None
+    with _controller_lock:
+        return _cached_controller(model_path, precision, device)
+
+
+def clear_model_cache():
+    """
+    Descarta os controllers em cache e libera a memória da GPU.
+    
+    Útil após falta de memória (OOM): o próximo get_controller recarrega o modelo.
+    """
+    with _controller_lock:
+        _cached_controller.cache_clear()
+    
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
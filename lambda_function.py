@@ -6,19 +6,100 @@ Detecção de Objetos - Otimizado
 Sistema otimizado para detectar objetos com YoloV8 incluindo pré-processamento de imagens.
 """
 
+import os
+from config.settings import config
+
+# Limita as threads OpenMP/BLAS aos núcleos disponíveis ao processo. As bibliotecas
+# leem essas variáveis ao carregar, então isto precisa vir antes de importar cv2/torch
+for _threads_var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+    os.environ.setdefault(_threads_var, str(config.CPU_THREADS))
+
 from utils.model_selector import ModelSelector
-from controller.inference_controller import InferenceController
-from controller.image_controller import ImageController
+from controller.image_controller import ImageController, has_libjpeg_turbo
 from utils.file_utils import FileUtils
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import time
+import numpy as np
+
+# Silencia o log por predição do Ultralytics (lido quando o pacote é importado)
+os.environ.setdefault('YOLO_VERBOSE', str(config.SHOW_YOLO_OUTPUT))
+
+# Quantidade de imagens enviadas ao modelo por forward pass
+BATCH_SIZE = 16
+
+# Valores aceitos em event['engine'] → precisão do modelo
+ENGINE_PRECISIONS = {
+    'pytorch': 'fp32',
+    'trt_fp16': 'fp16',
+    'trt_int8': 'int8'
+}
+
+# Modelo carregado e aquecido na inicialização do container; invocações seguintes
+# reutilizam o mesmo controller (get_controller mantém um cache por modelo)
+PRELOAD_MODEL = os.getenv("YOLO_PRELOAD_MODEL")
+if PRELOAD_MODEL:
+    from controller.inference_controller import get_controller
+    get_controller(PRELOAD_MODEL).inference_service.warmup()
+
+
+def _load_controller(model_path: str, warmup: bool, precision: str = None):
+    """Carrega (ou reaproveita) o controller do modelo e o aquece se solicitado."""
+    from controller.inference_controller import get_controller
+    
+    controller = get_controller(model_path, precision)
+    if warmup:
+        controller.inference_service.warmup()
+    return controller
+
+
+def _build_response(status_code: int, body: dict, timestamp: str) -> dict:
+    """Monta a resposta do handler em uma única construção de dicionário."""
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'status': 'success' if status_code < 400 else 'error',
+            'timestamp': timestamp
+        },
+        'body': body
+    }
+
+
+def _parse_flag(value, default: bool) -> bool:
+    """Interpreta um booleano do evento ("false"/"0" de JSON ou query string são False)."""
+    if value is None:
+        return default
+    return str(value).strip().lower() not in ('0', 'false', 'no', 'off', '')
+
+
+def _is_out_of_memory(error) -> bool:
+    """Verifica se um erro (exceção ou mensagem) indica falta de memória na GPU."""
+    return 'out of memory' in str(error or '').lower()
 
 
 def lambda_handler(event, context):
     """Detecção de objetos com otimização de imagens"""
     
+    # Horário de referência da invocação (capturado uma única vez)
+    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Parâmetros opcionais da invocação
+    event = event or {}
+    try:
+        batch_size = max(1, int(event.get('batch_size', BATCH_SIZE)))  # Imagens por forward pass
+    except (TypeError, ValueError):
+        return _build_response(400, {'error': f"batch_size inválido: {event.get('batch_size')!r}"}, timestamp)
+    warmup = _parse_flag(event.get('warmup'), default=True)  # Aquece o modelo antes da primeira imagem
+    precision = ENGINE_PRECISIONS.get(event.get('engine'))  # None → padrão da configuração
+    
     print("🔍 DETECÇÃO DE OBJETOS OTIMIZADA")
     print("="*40)
     
+    # Cria os diretórios do projeto (apenas na primeira invocação)
+    config.ensure_directories()
+    
+    if not has_libjpeg_turbo():
+        print("⚠️  Pillow sem libjpeg-turbo: leitura/gravação de JPEG será mais lenta")
+    
     # Passo 1: Escolher modelo
     print("\n📦 Escolha um modelo:")
     model_selector = ModelSelector()
@@ -26,10 +107,18 @@ def lambda_handler(event, context):
     
     if not selected_model:
         print("❌ Nenhum modelo selecionado. Cancelando processo.")
-        return
+        return _build_response(400, {'error': 'Nenhum modelo selecionado'}, timestamp)
     
     print(f"\n🎯 Usando modelo: {selected_model}")
     
+    # Importa a pilha de inferência (torch/ultralytics) só quando há modelo a usar
+    from controller.inference_controller import clear_model_cache
+    
+    # Carrega e aquece o modelo em segundo plano enquanto as imagens são analisadas
+    warmup_executor = ThreadPoolExecutor(max_workers=1)
+    controller_future = warmup_executor.submit(_load_controller, selected_model, warmup, precision)
+    warmup_executor.shutdown(wait=False)
+    
     # Passo 2: Analisar e otimizar imagens
     print("\n🖼️  Analisando imagens...")
     image_controller = ImageController()
@@ -39,7 +128,7 @@ def lambda_handler(event, context):
     
     if not image_paths:
         print("❌ Nenhuma imagem encontrada em img/inference_data")
-        return
+        return _build_response(404, {'error': 'Nenhuma imagem encontrada em img/inference_data'}, timestamp)
     
     print(f"� Encontradas {len(image_paths)} imagens")
     
@@ -48,21 +137,16 @@ def lambda_handler(event, context):
     
     if not valid_images:
         print("❌ Nenhuma imagem válida para processamento YOLO")
-        return
+        return _build_response(422, {'error': 'Nenhuma imagem válida para processamento YOLO'}, timestamp)
     
     # Analisar propriedades das imagens
     analysis = image_controller.analyze_image_properties(valid_images)
     image_controller.print_analysis_report(analysis)
     
-    # Otimizar imagens se necessário
-    optimized_images = valid_images
-    if analysis['needs_optimization']:
-        print(f"\n🔧 Otimizando {len(analysis['needs_optimization'])} imagens...")
-        optimized_images = image_controller.optimize_images_for_yolo(valid_images)
-        
-        # Relatório de otimização
-        optimization_report = image_controller.create_optimization_report(valid_images, optimized_images)
-        image_controller.print_optimization_report(optimization_report)
+    # Otimizar imagens se necessário (em memória, sem regravar JPEGs em disco)
+    optimize_in_memory = bool(analysis['needs_optimization'])
+    if optimize_in_memory:
+        print(f"\n🔧 {len(analysis['needs_optimization'])} imagens serão otimizadas em memória antes da inferência")
     else:
         print("\n✅ Imagens já estão otimizadas!")
     
@@ -71,27 +155,59 @@ def lambda_handler(event, context):
     print("="*50)
     
     try:
-        controller = InferenceController(selected_model)
+        controller = controller_future.result()
         
-        # Usar imagens otimizadas se existirem, senão usar originais
-        images_to_process = optimized_images if len(optimized_images) == len(valid_images) else valid_images
+        # Engine TensorRT aceita no máximo o lote definido na exportação
+        max_batch_size = controller.inference_service.max_batch_size
+        if max_batch_size and batch_size > max_batch_size:
+            print(f"⚠️  batch_size {batch_size} reduzido para {max_batch_size} (limite do engine TensorRT)")
+            batch_size = max_batch_size
         
-        # Processar cada imagem individualmente para melhor controle
-        total_detections = 0
-        successful_images = 0
+        images_to_process = valid_images
         
-        for i, img_path in enumerate(images_to_process, 1):
-            print(f"📷 ({i}/{len(images_to_process)}) Processando: {Path(img_path).name}")
-            
-            result = controller.run_single_image_inference(img_path, conf=0.5)
+        # Processar as imagens em lotes (um forward pass por lote)
+        detection_counts = np.zeros(len(images_to_process), dtype=np.int32)
+        success_flags = np.zeros(len(images_to_process), dtype=bool)
+        image_names = list(map(os.path.basename, images_to_process))
+        annotated_images = {}  # Nome da imagem → JPEG anotado em base64 (YOLO_ANNOTATED_BYTES)
+        processed = 0
+        out_of_memory = False
+        
+        # O próximo lote é preparado em segundo plano enquanto o atual está no modelo;
+        # em ambos os casos os arrays uint8 vão direto ao modelo (sem encode/decode JPEG)
+        if optimize_in_memory:
+            batches = image_controller.iter_optimized_batches(images_to_process, batch_size)
+        else:
+            # Threads de IO apenas decodificam as imagens
+            batches = controller.prefetch_batches(images_to_process, batch_size)
+        
+        for batch in batches:
+            for result in controller.run_batch_inference_on_arrays(batch, conf=0.5, batch_size=batch_size):
+                if 'error' not in result:
+                    detection_counts[processed] = result.get('detections_count', 0)
+                    success_flags[processed] = True
+                    if 'annotated_jpeg' in result:
+                        annotated_images[image_names[processed]] = result['annotated_jpeg']
+                    if config.VERBOSE_MODE:
+                        print(f"📷 ({processed + 1}/{len(images_to_process)}) Processado: {image_names[processed]}")
+                        print(f"   ✅ {detection_counts[processed]} objetos detectados")
+                else:
+                    # Erros são sempre exibidos
+                    print(f"❌ {image_names[processed]}: {result.get('error', 'Desconhecido')}")
+                    out_of_memory = out_of_memory or _is_out_of_memory(result.get('error'))
+                
+                processed += 1
             
-            if 'error' not in result:
-                detections = result.get('detections_count', 0)
-                total_detections += detections
-                successful_images += 1
-                print(f"   ✅ {detections} objetos detectados")
-            else:
-                print(f"   ❌ Erro: {result.get('error', 'Desconhecido')}")
+            # Modo silencioso: uma linha de progresso por lote
+            if not config.VERBOSE_MODE:
+                print(f"📷 {processed}/{len(images_to_process)} imagens processadas")
+        
+        # Falta de memória na GPU: descarta o modelo em cache para a próxima invocação recarregar
+        if out_of_memory:
+            clear_model_cache()
+        
+        total_detections = int(detection_counts.sum())
+        successful_images = int(success_flags.sum())
         
         # Passo 4: Mostrar resultados finais
         print(f"\n✅ RESULTADO FINAL:")
@@ -99,13 +215,24 @@ def lambda_handler(event, context):
         print(f"   🎯 Total de objetos detectados: {total_detections}")
         print(f"   📁 Resultados salvos em: output/")
         
-        if analysis['needs_optimization'] and optimized_images:
-            print(f"   � Imagens otimizadas salvas em: img/optimized/")
-        
     except Exception as e:
         print(f"❌ Erro durante inferência: {e}")
+        if _is_out_of_memory(e):
+            clear_model_cache()
+        return _build_response(500, {'error': str(e), 'model_used': selected_model}, timestamp)
 
     print(f"\n✅ Processo concluído!")
+    
+    body = {
+        'model_used': selected_model,
+        'images_processed': len(images_to_process),
+        'successful_images': successful_images,
+        'total_detections': total_detections
+    }
+    if annotated_images:
+        body['annotated_jpeg'] = annotated_images
+    
+    return _build_response(200, body, timestamp)
 
 if __name__ == "__main__":
     lambda_handler(event={}, context={})
@@ -6,30 +6,66 @@ Serviço principal para inferência com modelos YoloV8.
 """
 
 import os
+import base64
 import cv2
-import glob
-import shutil
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+import torch
 from ultralytics import YOLO
+from ultralytics.utils.downloads import attempt_download_asset
 import numpy as np
 from config.settings import config
+from utils.file_utils import FileUtils
+from utils.prefetch import iter_in_background
+
+# Deixa o cuDNN escolher (uma única vez) os algoritmos de convolução mais rápidos
+torch.backends.cudnn.benchmark = True
+
+# Evita que OpenCV e PyTorch disputem os mesmos núcleos em containers com poucas vCPUs.
+# OMP_NUM_THREADS precisa ser definido no ponto de entrada, antes de importar torch/cv2
+# (ver lambda_function.py); aqui os limites são aplicados explicitamente
+cv2.setNumThreads(max(1, config.CPU_THREADS // 2))  # 0 desativaria as threads do OpenCV por completo
+torch.set_num_threads(config.CPU_THREADS)
+
+if not torch.cuda.is_available():
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:  # Só pode ser definido antes do primeiro uso do pool inter-op
+        pass
 
 
 class YoloV8InferenceService:
     """Serviço de inferência YoloV8."""
     
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, precision: str = None):
         """
         Inicializa o serviço de inferência.
         
         Args:
             model_path (str): Caminho para o modelo (.pt). Se None, usa modelo padrão
+            precision (str): Precisão do engine TensorRT ("fp32", "fp16" ou "int8").
+                Se None, usa config.TENSORRT_PRECISION; se informada, o engine é usado
+                mesmo com USE_TENSORRT_ENGINE desativado
         """
         self.model_path = config.get_model_path(model_path or config.DEFAULT_MODEL)
+        self.precision = (precision or config.TENSORRT_PRECISION).lower()
+        self._engine_requested = precision is not None
         self.model = None
+        self.engine_path = None  # Engine TensorRT em uso (None = pesos PyTorch)
+        self.is_warm = False
+        self.half = False  # FP16 no predict (somente pesos PyTorch em GPU CUDA)
         self.output_dir = config.OUTPUT_DIR
-        self.output_dir.mkdir(exist_ok=True)
+        self.output_dir.mkdir(exist_ok=True, parents=True)
+        self._output_dir_str = str(self.output_dir)  # Evita str(Path) a cada imagem
+        
+        # Threads de IO: decode das próximas imagens e gravação das anotadas
+        # (o OpenCV libera o GIL) enquanto a GPU processa o lote atual
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
+        self._pending_writes = []
         
         # Carrega o modelo
         self.load_model()
@@ -43,14 +79,21 @@ class YoloV8InferenceService:
         """
         try:
             print(f"🔄 Carregando modelo: {self.model_path}")
+            self.engine_path = None
             
             # Caso 1: Modelo existe localmente
             if os.path.exists(self.model_path):
                 self._load_local_model()
-                return
+            else:
+                # Caso 2: Precisa baixar modelo pré-treinado
+                self._download_and_organize_model()
+            
+            # Usa engine TensorRT em vez dos pesos PyTorch quando há GPU (Tensor Cores)
+            if ((config.USE_TENSORRT_ENGINE or self._engine_requested) and self.precision != "fp32"
+                    and self.model_path.endswith(".pt") and torch.cuda.is_available()):
+                self._load_tensorrt_engine()
             
-            # Caso 2: Precisa baixar modelo pré-treinado
-            self._download_and_organize_model()
+            self.half = self._supports_half()
                 
         except Exception as e:
             print(f"❌ Erro ao carregar modelo: {e}")
@@ -66,104 +109,498 @@ class YoloV8InferenceService:
         self.model = YOLO(self.model_path)
         print(f"✅ Modelo carregado de: {self.model_path}")
     
-    def _download_and_organize_model(self):
+    def _supports_half(self) -> bool:
         """
-        Baixa modelo pré-treinado e organiza no diretório correto.
+        Verifica se o predict pode rodar em FP16 (half=True).
+        
+        Engines TensorRT têm a precisão fixada na exportação; na CPU não há ganho.
+        
+        Returns:
+            bool: True para pesos PyTorch com GPU CUDA disponível
+        """
+        return isinstance(getattr(self.model, 'model', None), torch.nn.Module) and torch.cuda.is_available()
+    
+    def _load_tensorrt_engine(self):
+        """
+        Carrega o engine TensorRT do modelo (FP16 ou INT8), exportando-o na primeira vez.
+        
+        Em caso de falha (sem GPU/TensorRT), mantém o modelo PyTorch carregado.
         
         Returns:
             None
         """
-        print(f"⬇️  Baixando modelo pré-treinado: {self.model_path}")
+        precision = self.precision
+        engine_path = config.get_engine_path(self.model_path, precision)
         
-        # Carrega o modelo (que fará o download automático na raiz)
-        self.model = YOLO(self.model_path)
+        try:
+            if not os.path.exists(engine_path):
+                print(f"⚙️  Exportando engine TensorRT {precision.upper()}: {engine_path}")
+                export_args = {'half': True}
+                if precision == "int8":
+                    # INT8 calibrado com imagens do dataset informado (ou das imagens de inferência)
+                    export_args = {
+                        'int8': True,
+                        'data': config.INT8_CALIBRATION_DATA or self._build_calibration_data()
+                    }
+                
+                exported_path = self.model.export(
+                    format="engine",
+                    simplify=True,
+                    imgsz=config.DEFAULT_IMAGE_SIZE,
+                    dynamic=True,
+                    batch=config.TENSORRT_MAX_BATCH_SIZE,
+                    device=0,
+                    workspace=config.TENSORRT_WORKSPACE_GB,
+                    **export_args
+                )
+                
+                # Ultralytics sempre grava <nome>.engine; separa por precisão
+                if os.path.abspath(str(exported_path)) != os.path.abspath(engine_path):
+                    os.replace(str(exported_path), engine_path)
+            
+            # O engine só é desserializado no primeiro predict: valida (e aquece)
+            # antes de substituir o modelo PyTorch, que segue em uso se falhar
+            engine = YOLO(str(engine_path), task="detect")
+            dummy_image = self._dummy_image()
+            with torch.inference_mode():
+                for _ in range(max(1, config.WARMUP_RUNS)):
+                    engine.predict(source=dummy_image, verbose=False)
+            
+            self.model = engine
+            self.engine_path = engine_path
+            self.is_warm = True
+            print(f"✅ Engine TensorRT carregado de: {engine_path}")
+            
+        except Exception as e:
+            print(f"⚠️  Aviso: Engine TensorRT indisponível, usando modelo PyTorch: {e}")
+    
+    @property
+    def max_batch_size(self) -> Optional[int]:
+        """
+        Maior lote aceito pelo modelo carregado.
         
-        # Verifica se precisa mover o modelo baixado
-        downloaded_model = Path(self.model_path)
-        if downloaded_model.exists() and not downloaded_model.is_absolute():
-            self._move_downloaded_model(downloaded_model)
+        Returns:
+            int: Lote máximo do engine TensorRT, ou None para pesos PyTorch (sem limite)
+        """
+        return config.TENSORRT_MAX_BATCH_SIZE if self.engine_path else None
+    
+    def _build_calibration_data(self) -> str:
+        """
+        Gera um dataset de calibração INT8 com as imagens de inferência.
         
-        print(f"✅ Modelo baixado e carregado: {self.model_path}")
+        Returns:
+            str: Caminho do YAML do dataset (JSON também é YAML válido)
+        """
+        image_files = self._find_image_files(str(config.INFERENCE_DATA_DIR))[:config.INT8_CALIBRATION_IMAGES]
+        if not image_files:
+            raise FileNotFoundError(f"Nenhuma imagem para calibração INT8 em: {config.INFERENCE_DATA_DIR}")
+        
+        calibration_dir = config.OUTPUT_DIR / "int8_calibration"
+        calibration_dir.mkdir(exist_ok=True, parents=True)
+        
+        images_file = calibration_dir / "images.txt"
+        images_file.write_text("\n".join(os.path.abspath(path) for path in image_files) + "\n")
+        
+        data_file = calibration_dir / "calibration.yaml"
+        data_file.write_text(json.dumps({
+            'path': str(calibration_dir),
+            'train': images_file.name,
+            'val': images_file.name,
+            'names': {int(k): v for k, v in self.model.names.items()}
+        }, ensure_ascii=False))
+        
+        print(f"🎯 Calibração INT8 com {len(image_files)} imagens de: {config.INFERENCE_DATA_DIR}")
+        return str(data_file)
+    
+    def warmup(self):
+        """
+        Executa inferências com uma imagem vazia para aquecer o modelo.
+        
+        O aquecimento acontece apenas uma vez por modelo carregado.
+        
+        Returns:
+            None
+        """
+        if self.is_warm:
+            return
+        
+        dummy_image = self._dummy_image()
+        # Mesmo contexto das inferências reais (torch.compile especializa o grafo nele)
+        with torch.inference_mode():
+            for run in range(config.WARMUP_RUNS):
+                self.model.predict(source=dummy_image, verbose=False, half=self.half)
+                if run == 0 and config.USE_TORCH_COMPILE:
+                    # Próximas execuções de aquecimento disparam a compilação
+                    self._compile_model()
+        
+        self.is_warm = True
+    
+    @staticmethod
+    def _dummy_image() -> np.ndarray:
+        """Imagem preta no tamanho padrão de entrada, usada no aquecimento."""
+        return np.zeros((config.DEFAULT_IMAGE_SIZE, config.DEFAULT_IMAGE_SIZE, 3), dtype=np.uint8)
     
-    def _move_downloaded_model(self, downloaded_model: Path):
+    def _compile_model(self):
+        """
+        Compila o forward PyTorch com torch.compile (PyTorch >= 2.1, GPU CUDA).
+        
+        Compila o módulo já fundido (Conv+BN) pelo predictor do Ultralytics;
+        cada novo shape de entrada gera uma recompilação.
+        
+        Returns:
+            None
         """
-        Move modelo baixado para diretório organizado.
+        backend = getattr(getattr(self.model, 'predictor', None), 'model', None)
+        module = getattr(backend, 'model', None)
+        torch_version = tuple(int(part) for part in torch.__version__.split('+')[0].split('.')[:2])
+        
+        if (not isinstance(module, torch.nn.Module) or not torch.cuda.is_available()
+                or torch_version < (2, 1) or hasattr(module, '_orig_mod')):
+            return
+        
+        try:
+            backend.model = torch.compile(module, mode='reduce-overhead', dynamic=False)
+            print("⚙️  Modelo compilado com torch.compile")
+        except Exception as e:
+            print(f"⚠️  Aviso: torch.compile indisponível, usando modelo padrão: {e}")
+    
+    def swap_weights(self, weights_path: str) -> bool:
+        """
+        Troca os pesos do modelo carregado reaproveitando o wrapper YOLO.
+        
+        Só é possível entre checkpoints PyTorch (.pt) locais da mesma tarefa;
+        engines TensorRT exigem um novo carregamento.
         
         Args:
-            downloaded_model (Path): Caminho do modelo baixado
+            weights_path (str): Caminho do checkpoint .pt com os novos pesos
             
+        Returns:
+            bool: True se os pesos foram trocados
+        """
+        current_model = getattr(self.model, 'model', None)
+        if not isinstance(current_model, torch.nn.Module) or not str(weights_path).endswith('.pt'):
+            return False
+        
+        try:
+            ckpt = torch.load(weights_path, map_location='cpu', weights_only=False)
+            new_model = (ckpt.get('ema') or ckpt['model']).float().eval()
+        except Exception as e:
+            print(f"⚠️  Aviso: Não foi possível ler os pesos de {weights_path}: {e}")
+            return False
+        
+        # Tarefas diferentes (ex: detecção x segmentação) exigem outro wrapper
+        if type(new_model) is not type(current_model):
+            return False
+        
+        self.model.model = new_model
+        self.model.ckpt = ckpt
+        self.model.predictor = None  # Recria o predictor com os novos pesos na próxima chamada
+        self.half = self._supports_half()
+        self.model_path = str(weights_path)
+        self.is_warm = False
+        
+        print(f"🔁 Pesos trocados para: {weights_path}")
+        return True
+    
+    def _download_and_organize_model(self):
+        """
+        Baixa modelo pré-treinado direto no diretório correto e carrega uma única vez.
+        
         Returns:
             None
         """
-        target_path = config.PRETRAINED_MODELS_DIR / downloaded_model.name
+        print(f"⬇️  Baixando modelo pré-treinado: {self.model_path}")
         
+        # Baixa direto em models/pretrained (sem mover depois nem carregar duas vezes)
+        target_path = config.PRETRAINED_MODELS_DIR / Path(self.model_path).name
         try:
-            shutil.move(str(downloaded_model), str(target_path))
-            print(f"📁 Modelo movido para: {target_path}")
-            
-            # Atualiza o caminho do modelo e recarrega
-            self.model_path = str(target_path)
-            self.model = YOLO(str(target_path))
-        except Exception as move_error:
-            print(f"⚠️  Aviso: Não foi possível mover o modelo: {move_error}")
+            self.model_path = attempt_download_asset(str(target_path))
+        except Exception as download_error:
+            # Deixa o Ultralytics resolver o nome (download na pasta atual)
+            print(f"⚠️  Aviso: Não foi possível baixar em {target_path}: {download_error}")
+        
+        self.model = YOLO(self.model_path)
+        
+        print(f"✅ Modelo baixado e carregado: {self.model_path}")
     
-    def run_inference_on_image(self, image_path: str, conf: float = 0.5) -> Dict[str, Any]:
+    def run_inference_on_image(self, image_path: Union[str, np.ndarray], conf: float = 0.5,
+                               image_name: Optional[str] = None, save_annotated: bool = True) -> Dict[str, Any]:
         """
         Executa inferência em uma única imagem.
         
         Args:
-            image_path (str): Caminho para a imagem
+            image_path (str | np.ndarray): Caminho para a imagem ou imagem BGR já decodificada
             conf (float): Threshold de confiança
+            image_name (str): Caminho/nome usado no resultado quando image_path é um array
+            save_annotated (bool): Se deve desenhar e gravar a imagem anotada
             
         Returns:
             result (Dict): Dicionário com resultados da inferência
         """
+        source = image_path
+        if isinstance(image_path, np.ndarray):
+            image_path = image_name or "image.jpg"
+        
         try:
-            # Executa inferência
-            results = self.model(image_path, conf=conf)
+            # Executa inferência (sem autograd)
+            with torch.inference_mode():
+                results = self.model(source, conf=conf, half=self.half, verbose=config.SHOW_YOLO_OUTPUT)
             result = results[0]  # Primeira (única) imagem
             
             # Extrai informações das detecções
-            detections = self._extract_detections(result)
+            arrays = self._extract_detection_arrays(result)
+            detections = self._extract_detections(result, arrays)
             
-            # Salva imagem com detecções
-            output_path = self.save_annotated_image(result, image_path)
+            # Salva (ou codifica em memória) a imagem com detecções
+            response = self._build_annotated_response(result, image_path, detections, conf,
+                                                      save_annotated, arrays)
+            self.wait_pending_writes()
             
-            return self._build_success_response(image_path, output_path, detections, conf)
+            return response
             
         except Exception as e:
             print(f"❌ Erro na inferência de {image_path}: {e}")
             return self._build_error_response(image_path, str(e))
     
-    def _extract_detections(self, result) -> List[Dict[str, Any]]:
+    def run_batch_inference(self, image_paths: List[str], conf: float = 0.5,
+                            batch_size: int = 16, save_annotated: bool = True) -> List[Dict[str, Any]]:
+        """
+        Executa inferência em lotes, com um único forward pass por lote.
+        
+        Args:
+            image_paths (List): Lista de caminhos de imagens
+            conf (float): Threshold de confiança
+            batch_size (int): Quantidade de imagens por chamada ao modelo
+            save_annotated (bool): Se deve desenhar e gravar as imagens anotadas
+            
+        Returns:
+            results (List): Lista com resultados na mesma ordem de image_paths
+        """
+        # Lotes já decodificados por uma thread produtora, em paralelo com a GPU
+        return self._infer_decoded_batches(self.prefetch_batches(image_paths, batch_size), conf, save_annotated)
+    
+    def run_batch_inference_on_arrays(self, images: List[Tuple[str, Optional[np.ndarray]]],
+                                      conf: float = 0.5, batch_size: int = 16,
+                                      save_annotated: bool = True) -> List[Dict[str, Any]]:
+        """
+        Executa inferência em lotes de imagens já decodificadas em memória.
+        
+        Evita gravar e reler JPEGs intermediários: os arrays uint8 vão direto ao modelo.
+        
+        Args:
+            images (List): Tuplas (caminho de origem, imagem BGR ou None)
+            conf (float): Threshold de confiança
+            batch_size (int): Quantidade de imagens por chamada ao modelo
+            save_annotated (bool): Se deve desenhar e gravar as imagens anotadas
+            
+        Returns:
+            results (List): Lista com resultados na mesma ordem de images
+        """
+        return self._infer_decoded_batches(self.chunk_paths(images, batch_size), conf, save_annotated)
+    
+    def _infer_decoded_batches(self, batches: Iterable[List[Tuple[str, Optional[np.ndarray]]]],
+                               conf: float, save_annotated: bool = True) -> List[Dict[str, Any]]:
+        """
+        Executa um forward pass por lote de imagens decodificadas.
+        
+        Args:
+            batches (Iterable): Lotes de tuplas (caminho, imagem BGR ou None)
+            conf (float): Threshold de confiança
+            save_annotated (bool): Se deve desenhar e gravar as imagens anotadas
+            
+        Returns:
+            results (List): Resultados na ordem dos lotes recebidos
+        """
+        all_results = []
+        for batch_results in self._iter_decoded_batches(batches, conf, save_annotated):
+            all_results.extend(batch_results)
+        return all_results
+    
+    def _iter_decoded_batches(self, batches: Iterable[List[Tuple[str, Optional[np.ndarray]]]],
+                              conf: float, save_annotated: bool = True) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Executa um forward pass por lote e entrega os resultados de cada lote assim que prontos.
+        
+        Args:
+            batches (Iterable): Lotes de tuplas (caminho, imagem BGR ou None)
+            conf (float): Threshold de confiança
+            save_annotated (bool): Se deve desenhar e gravar as imagens anotadas
+            
+        Returns:
+            results (Iterator): Listas de resultados, uma por lote, na ordem recebida
+        """
+        processed = 0
+        release_every = config.CUDA_EMPTY_CACHE_EVERY if torch.cuda.is_available() else 0
+        
+        try:
+            for batch in batches:
+                batch_results = [
+                    None if image is not None else self._build_error_response(path, "Não foi possível ler a imagem")
+                    for path, image in batch
+                ]
+                loaded = [i for i, (_, image) in enumerate(batch) if image is not None]
+                
+                if loaded:
+                    try:
+                        # Lista de arrays → Ultralytics monta um único tensor (N,3,H,W);
+                        # stream=True entrega os Results um a um, sem manter o lote inteiro
+                        with torch.inference_mode():
+                            results = self.model.predict(source=[batch[i][1] for i in loaded], conf=conf,
+                                                         half=self.half, verbose=False, stream=True)
+                            
+                            for i, result in zip(loaded, results):
+                                image_path = batch[i][0]
+                                arrays = self._extract_detection_arrays(result)
+                                detections = self._extract_detections(result, arrays)
+                                batch_results[i] = self._build_annotated_response(result, image_path, detections,
+                                                                                  conf, save_annotated, arrays)
+                            
+                    except Exception as e:
+                        # Uma imagem problemática não descarta o lote: as pendentes são refeitas uma a uma
+                        print(f"❌ Erro na inferência do lote, reprocessando imagens individualmente: {e}")
+                        for i in loaded:
+                            if batch_results[i] is None:
+                                batch_results[i] = self._infer_single_array(batch[i][0], batch[i][1],
+                                                                            conf, save_annotated)
+                
+                processed += len(batch)
+                
+                # Devolve ao driver a memória de GPU em cache (pastas muito grandes)
+                if release_every and processed // release_every != (processed - len(batch)) // release_every:
+                    torch.cuda.empty_cache()
+                
+                yield batch_results
+        finally:
+            self.wait_pending_writes()
+    
+    def prefetch_batches(self, image_paths: Iterable[str],
+                          batch_size: int) -> Iterator[List[Tuple[str, Optional[np.ndarray]]]]:
+        """
+        Decodifica lotes de imagens em uma thread produtora.
+        
+        A leitura do disco e a decodificação do próximo lote acontecem enquanto
+        o lote atual está no modelo. A fila limitada controla o uso de memória;
+        erros de leitura são relançados no consumidor.
+        
+        Args:
+            image_paths (Iterable): Caminhos de imagens (lista ou gerador)
+            batch_size (int): Quantidade de imagens por lote
+            
+        Returns:
+            batches (Iterator): Lotes de tuplas (caminho, imagem BGR ou None)
+        """
+        def decode_batches():
+            for chunk in self.chunk_paths(image_paths, batch_size):
+                # Decode das imagens do lote em paralelo
+                yield list(zip(chunk, self._io_pool.map(self._read_image, chunk)))
+        
+        return iter_in_background(decode_batches(), maxsize=2)
+    
+    @staticmethod
+    def _read_image(image_path: str) -> Optional[np.ndarray]:
+        """
+        Lê os bytes do arquivo e decodifica em memória com cv2.imdecode.
+        
+        Args:
+            image_path (str): Caminho da imagem
+            
+        Returns:
+            image (np.ndarray): Imagem BGR (uint8) ou None se não puder ser lida
+        """
+        try:
+            data = np.fromfile(image_path, dtype=np.uint8)
+        except OSError:
+            return None
+        
+        return cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+    
+    @staticmethod
+    def chunk_paths(image_paths: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+        """
+        Divide uma sequência de caminhos em lotes de tamanho fixo.
+        
+        Args:
+            image_paths (Iterable): Caminhos de imagens
+            batch_size (int): Tamanho máximo de cada lote
+            
+        Returns:
+            chunks (Iterator): Iterador de listas com até batch_size caminhos
+        """
+        iterator = iter(image_paths)
+        while True:
+            chunk = list(islice(iterator, max(batch_size, 1)))
+            if not chunk:
+                return
+            yield chunk
+    
+    def _extract_detection_arrays(self, result) -> Dict[str, np.ndarray]:
+        """
+        Extrai as detecções como arrays NumPy (estrutura de arrays).
+        
+        Args:
+            result: Resultado da inferência YoloV8
+            
+        Returns:
+            arrays (Dict): 'class_ids' (N,) int32, 'confs' (N,) float32 e 'xyxy' (N, 4) float32
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return {
+                'class_ids': np.empty(0, dtype=np.int32),
+                'confs': np.empty(0, dtype=np.float32),
+                'xyxy': np.empty((0, 4), dtype=np.float32)
+            }
+        
+        # Uma única cópia GPU→CPU: colunas [x1, y1, x2, y2, (track_id), conf, cls]
+        data = boxes.data.cpu().numpy() if hasattr(boxes.data, 'cpu') else np.asarray(boxes.data)
+        return {
+            'class_ids': data[:, -1].astype(np.int32),
+            'confs': data[:, -2].astype(np.float32),
+            'xyxy': np.ascontiguousarray(data[:, :4], dtype=np.float32)
+        }
+    
+    def _extract_detections(self, result, arrays: Optional[Dict[str, np.ndarray]] = None) -> List[Dict[str, Any]]:
         """
         Extrai informações das detecções do resultado YoloV8.
         
         Args:
             result: Resultado da inferência YoloV8
+            arrays (Dict): Arrays já extraídos por _extract_detection_arrays (opcional)
             
         Returns:
             detections (List): Lista de detecções extraídas
         """
-        detections = []
+        if arrays is None:
+            arrays = self._extract_detection_arrays(result)
+        if not len(arrays['class_ids']):
+            return []
         
-        if result.boxes is None:
-            return detections
+        # [x_center, y_center, width, height] normalizado pelo tamanho original
+        xyxy = arrays['xyxy']
+        height, width = result.orig_shape[:2]
+        xywhn = np.empty_like(xyxy)
+        xywhn[:, 0] = (xyxy[:, 0] + xyxy[:, 2]) / 2 / width
+        xywhn[:, 1] = (xyxy[:, 1] + xyxy[:, 3]) / 2 / height
+        xywhn[:, 2] = (xyxy[:, 2] - xyxy[:, 0]) / width
+        xywhn[:, 3] = (xyxy[:, 3] - xyxy[:, 1]) / height
         
-        for i, box in enumerate(result.boxes):
-            detection = {
-                'class_id': int(box.cls[0]),
-                'class_name': result.names[int(box.cls[0])],
-                'confidence': float(box.conf[0]),
-                'bbox': box.xyxy[0].tolist(),  # [x1, y1, x2, y2]
-                'bbox_normalized': box.xywhn[0].tolist()  # [x_center, y_center, width, height] normalized
+        names = result.names
+        return [
+            {
+                'class_id': class_id,
+                'class_name': names[class_id],
+                'confidence': confidence,
+                'bbox': bbox,  # [x1, y1, x2, y2]
+                'bbox_normalized': bbox_normalized
             }
-            detections.append(detection)
-        
-        return detections
+            for class_id, confidence, bbox, bbox_normalized in zip(
+                arrays['class_ids'].tolist(), arrays['confs'].tolist(), xyxy.tolist(), xywhn.tolist()
+            )
+        ]
     
     def _build_success_response(self, image_path: str, output_path: str, 
-                               detections: List[Dict], conf: float) -> Dict[str, Any]:
+                               detections: List[Dict], conf: float,
+                               arrays: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
         """
         Constrói resposta de sucesso da inferência.
         
@@ -172,11 +609,12 @@ class YoloV8InferenceService:
             output_path (str): Caminho da imagem anotada
             detections (List): Lista de detecções
             conf (float): Threshold de confiança usado
+            arrays (Dict): Detecções em arrays NumPy, anexadas como 'detections_soa'
             
         Returns:
             response (Dict): Dicionário com resposta de sucesso
         """
-        return {
+        response = {
             'image_path': image_path,
             'output_path': output_path,
             'detections_count': len(detections),
@@ -184,6 +622,40 @@ class YoloV8InferenceService:
             'model_used': self.model_path,
             'confidence_threshold': conf
         }
+        if arrays is not None:
+            response['detections_soa'] = arrays
+        return response
+    
+    def _build_annotated_response(self, result, image_path: str, detections: List[Dict],
+                                  conf: float, save_annotated: bool,
+                                  arrays: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+        """
+        Constrói a resposta de sucesso tratando a imagem anotada.
+        
+        Com config.RETURN_ANNOTATED_BYTES, a imagem anotada vai na resposta
+        (JPEG em base64, chave 'annotated_jpeg') em vez de ser gravada em disco.
+        
+        Args:
+            result: Resultado da inferência YoloV8
+            image_path (str): Caminho da imagem original
+            detections (List): Lista de detecções
+            conf (float): Threshold de confiança usado
+            save_annotated (bool): Se deve gerar a imagem anotada
+            arrays (Dict): Detecções em arrays NumPy (opcional)
+            
+        Returns:
+            response (Dict): Dicionário com resposta de sucesso
+        """
+        if not save_annotated:
+            return self._build_success_response(image_path, "", detections, conf, arrays)
+        
+        if not config.RETURN_ANNOTATED_BYTES:
+            output_path = self.save_annotated_image(result, image_path)
+            return self._build_success_response(image_path, output_path, detections, conf, arrays)
+        
+        response = self._build_success_response(image_path, "", detections, conf, arrays)
+        response['annotated_jpeg'] = self.encode_annotated_image(result)
+        return response
     
     def _build_error_response(self, image_path: str, error_message: str) -> Dict[str, Any]:
         """
@@ -218,26 +690,64 @@ class YoloV8InferenceService:
             # Cria imagem anotada
             annotated_img = result.plot()
             
-            # Define caminho de saída
-            original_name = Path(original_path).stem
-            output_path = self.output_dir / f"{original_name}_detected.jpg"
+            # Define caminho de saída (strings puras, sem Path por imagem)
+            original_name = os.path.splitext(os.path.basename(original_path))[0]
+            output_path = os.path.join(self._output_dir_str, f"{original_name}_detected.jpg")
             
-            # Salva imagem
-            cv2.imwrite(str(output_path), annotated_img)
+            # Grava em segundo plano; o encode JPEG não bloqueia o próximo lote
+            self._pending_writes.append(self._io_pool.submit(
+                cv2.imwrite, output_path, annotated_img,
+                [cv2.IMWRITE_JPEG_QUALITY, config.ANNOTATED_JPEG_QUALITY]
+            ))
             
-            return str(output_path)
+            return output_path
             
         except Exception as e:
             print(f"⚠️  Erro ao salvar imagem anotada: {e}")
             return ""
     
-    def run_inference_on_folder(self, folder_path: str, conf: float = 0.5) -> List[Dict[str, Any]]:
+    def encode_annotated_image(self, result) -> str:
+        """
+        Codifica a imagem anotada como JPEG em memória, sem tocar o disco.
+        
+        Args:
+            result: Resultado da inferência YoloV8
+            
+        Returns:
+            jpeg (str): JPEG codificado em base64 ("" em caso de erro)
+        """
+        try:
+            ok, buffer = cv2.imencode('.jpg', result.plot(),
+                                      [cv2.IMWRITE_JPEG_QUALITY, config.ANNOTATED_JPEG_QUALITY])
+            return base64.b64encode(buffer).decode('ascii') if ok else ""
+        except Exception as e:
+            print(f"⚠️  Erro ao codificar imagem anotada: {e}")
+            return ""
+    
+    def wait_pending_writes(self):
+        """
+        Aguarda a gravação das imagens anotadas enviadas ao pool de IO.
+        
+        Returns:
+            None
+        """
+        pending, self._pending_writes = self._pending_writes, []
+        for future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"⚠️  Erro ao salvar imagem anotada: {e}")
+    
+    def run_inference_on_folder(self, folder_path: str, conf: float = 0.5,
+                                batch_size: int = 16, save_annotated: bool = True) -> List[Dict[str, Any]]:
         """
         Executa inferência em todas as imagens de uma pasta.
         
         Args:
             folder_path (str): Caminho para a pasta com imagens
             conf (float): Threshold de confiança
+            batch_size (int): Quantidade de imagens por chamada ao modelo
+            save_annotated (bool): Se deve desenhar e gravar as imagens anotadas
             
         Returns:
             results (List): Lista com resultados de todas as imagens
@@ -251,8 +761,82 @@ class YoloV8InferenceService:
         
         print(f"🖼️  Encontradas {len(image_files)} imagens para processar")
         
-        # Processa cada imagem
-        return self._process_all_images(image_files, conf)
+        # Processa as imagens em lotes
+        return self._process_all_images(image_files, conf, batch_size, save_annotated)
+    
+    def _infer_single_array(self, image_path: str, image: np.ndarray, conf: float,
+                            save_annotated: bool = True) -> Dict[str, Any]:
+        """
+        Executa inferência em uma única imagem decodificada (fallback de lotes com erro).
+        
+        Args:
+            image_path (str): Caminho de origem da imagem
+            image (np.ndarray): Imagem BGR (uint8)
+            conf (float): Threshold de confiança
+            save_annotated (bool): Se deve desenhar e gravar a imagem anotada
+            
+        Returns:
+            result (Dict): Resultado da inferência ou resposta de erro
+        """
+        try:
+            with torch.inference_mode():
+                result = self.model.predict(source=image, conf=conf, half=self.half, verbose=False)[0]
+            
+            arrays = self._extract_detection_arrays(result)
+            detections = self._extract_detections(result, arrays)
+            return self._build_annotated_response(result, image_path, detections, conf, save_annotated, arrays)
+            
+        except Exception as e:
+            print(f"❌ Erro na inferência de {image_path}: {e}")
+            return self._build_error_response(image_path, str(e))
+    
+    def run_multi_source(self, sources: List[str], conf: float = 0.5,
+                         max_frames: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Rastreia objetos em várias fontes de vídeo/RTSP com um único modelo.
+        
+        As fontes são lidas pelo Ultralytics a partir de um arquivo .streams e
+        os frames de todas as fontes formam um único lote por forward pass.
+        O rastreamento usa uma instância YOLO própria: os callbacks de tracker
+        persistentes não afetam o modelo compartilhado usado no predict.
+        
+        Args:
+            sources (List): URLs RTSP/HTTP, caminhos de vídeo ou índices de webcam
+            conf (float): Threshold de confiança
+            max_frames (int): Quantidade máxima de lotes de frames (None = até o fim)
+            
+        Returns:
+            results (Iterator): Um resultado por frame, conforme chegam
+        """
+        # Lista de fontes exclusiva desta chamada (chamadas simultâneas não se sobrescrevem)
+        with tempfile.NamedTemporaryFile('w', suffix='.streams', dir=self._output_dir_str,
+                                         delete=False) as streams_file:
+            streams_file.write("\n".join(sources) + "\n")
+        
+        try:
+            tracker_model = (YOLO(str(self.engine_path), task="detect") if self.engine_path
+                             else YOLO(self.model_path))
+            results = tracker_model.track(source=streams_file.name, conf=conf, stream=True, half=self.half,
+                                          vid_stride=1, persist=True, verbose=config.SHOW_YOLO_OUTPUT)
+            
+            for frame_index, result in enumerate(results):
+                if max_frames is not None and frame_index >= max_frames * len(sources):
+                    break
+                
+                detections = self._extract_detections(result)
+                if result.boxes is not None and result.boxes.id is not None:
+                    for detection, track_id in zip(detections, result.boxes.id.tolist()):
+                        detection['track_id'] = int(track_id)
+                
+                yield {
+                    'source': result.path,
+                    'detections_count': len(detections),
+                    'detections': detections,
+                    'model_used': self.model_path,
+                    'confidence_threshold': conf
+                }
+        finally:
+            os.remove(streams_file.name)
     
     def _find_image_files(self, folder_path: str) -> List[str]:
         """
@@ -264,34 +848,27 @@ class YoloV8InferenceService:
         Returns:
             image_files (List): Lista de caminhos de imagens encontradas
         """
-        # Usa extensões da configuração
-        image_extensions = [f"*{ext}" for ext in config.SUPPORTED_IMAGE_EXTENSIONS]
-        
-        # Encontra todas as imagens (usando set para evitar duplicatas)
-        image_files = set()
-        for ext in image_extensions:
-            image_files.update(glob.glob(os.path.join(folder_path, ext)))
-            image_files.update(glob.glob(os.path.join(folder_path, ext.upper())))
-        
-        # Converte para lista e ordena
-        return sorted(list(image_files))
+        # Uma única passada de os.scandir (extensões comparadas em minúsculo), já ordenada
+        return FileUtils.find_images_in_folder(folder_path)
     
-    def _process_all_images(self, image_files: List[str], conf: float) -> List[Dict[str, Any]]:
+    def _process_all_images(self, image_files: List[str], conf: float,
+                            batch_size: int = 16, save_annotated: bool = True) -> List[Dict[str, Any]]:
         """
-        Processa lista de imagens com inferência.
+        Processa lista de imagens com inferência, um forward pass por lote.
         
         Args:
             image_files (List): Lista de caminhos de imagens
             conf (float): Threshold de confiança
+            batch_size (int): Quantidade de imagens por chamada ao modelo
+            save_annotated (bool): Se deve desenhar e gravar as imagens anotadas
             
         Returns:
             results (List): Lista com resultados de todas as imagens
         """
-        all_results = []
+        all_results = self.run_batch_inference(image_files, conf, batch_size, save_annotated)
         
-        for i, image_path in enumerate(image_files, 1):
-            print(f"📷 Processando ({i}/{len(image_files)}): {os.path.basename(image_path)}")
-            result = self.run_inference_on_image(image_path, conf)
-            all_results.append(result)
+        if config.VERBOSE_MODE:
+            for i, result in enumerate(all_results, 1):
+                print(f"📷 Processado ({i}/{len(image_files)}): {os.path.basename(result['image_path'])}")
         
         return all_results
@@ -5,25 +5,61 @@ Report Service
 Serviço para geração de relatórios de inferência.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+import numpy as np
 
 
 class ReportService:
     """Serviço de geração de relatórios."""
     
     @staticmethod
-    def generate_summary_report(results: List[Dict[str, Any]], model_path: str = None) -> Dict[str, Any]:
-        """Gera relatório resumido dos resultados."""
+    def generate_summary_report(results: List[Dict[str, Any]], model_path: str = None,
+                                class_names: Optional[Dict[int, str]] = None) -> Dict[str, Any]:
+        """
+        Gera relatório resumido dos resultados.
+        
+        Args:
+            results: Resultados da inferência
+            model_path: Caminho do modelo usado
+            class_names: Mapa class_id → nome do modelo (se None, usa os nomes das detecções)
+            
+        Returns:
+            Dicionário com o resumo
+        """
         total_images = len(results)
-        total_detections = sum(r.get('detections_count', 0) for r in results)
-        successful_inferences = len([r for r in results if 'error' not in r])
+        total_detections = 0
+        successful_inferences = 0
+        class_id_arrays = []
         
-        # Conta classes detectadas
-        class_counts = {}
+        # Uma única passada: sucesso, total de detecções e ids das classes
         for result in results:
-            for detection in result.get('detections', []):
-                class_name = detection.get('class_name', 'unknown')
-                class_counts[class_name] = class_counts.get(class_name, 0) + 1
+            if 'error' in result:
+                continue
+            successful_inferences += 1
+            detections = result.get('detections', ())
+            total_detections += result.get('detections_count', len(detections))
+            
+            # Arrays anexados pelo serviço evitam percorrer os dicts de detecção
+            soa = result.get('detections_soa')
+            if soa is not None:
+                class_id_arrays.append(soa['class_ids'])
+            elif detections:
+                class_id_arrays.append(np.fromiter((d['class_id'] for d in detections),
+                                                   dtype=np.int32, count=len(detections)))
+        
+        # Contagem vetorizada por id (sem hash de string por detecção)
+        class_counts = {}
+        class_ids = np.concatenate(class_id_arrays) if class_id_arrays else np.empty(0, dtype=np.int32)
+        if class_ids.size:
+            if class_names is None:
+                class_names = {
+                    detection['class_id']: detection.get('class_name', 'unknown')
+                    for result in results for detection in result.get('detections', ())
+                }
+            counts = np.bincount(class_ids)
+            class_counts = {class_names.get(class_id, 'unknown'): int(count)
+                            for class_id, count in enumerate(counts) if count}
         
         summary = {
             'total_images_processed': total_images,
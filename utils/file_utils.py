@@ -6,11 +6,43 @@ Utilitários para manipulação de arquivos e diretórios.
 """
 
 import os
-import glob
+import json
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 from config.settings import config
 
+try:
+    import orjson
+except ImportError:  # orjson é opcional; usa o json da biblioteca padrão
+    orjson = None
+
+# Extensões suportadas em minúsculo (comparação sem alocação por chamada)
+IMAGE_EXTENSIONS = frozenset(ext.lower() for ext in config.SUPPORTED_IMAGE_EXTENSIONS)
+
+# Pastas alteradas há menos tempo que isto são relidas sem cache: em sistemas de
+# arquivos com mtime de baixa resolução, uma nova mudança pode manter o mesmo mtime
+_MTIME_SETTLE_NS = 2_000_000_000
+
+
+def _to_builtin(value: Any) -> Any:
+    """Converte arrays/escalares NumPy para tipos nativos no fallback com json."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@lru_cache(maxsize=8)
+def _scan_images(folder_path: str, mtime_ns: int) -> Tuple[str, ...]:
+    """Lista as imagens de uma pasta com uma única passada de os.scandir."""
+    with os.scandir(folder_path) as entries:
+        image_files = [
+            entry.path for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file()
+        ]
+    return tuple(sorted(image_files))
+
 
 class FileUtils:
     """Utilitários para arquivos."""
@@ -26,25 +58,23 @@ class FileUtils:
         Returns:
             Lista de caminhos das imagens (sem duplicatas)
         """
-        image_extensions = config.SUPPORTED_IMAGE_EXTENSIONS
-        
-        image_files = set()  # Usar set para evitar duplicatas
-        folder = Path(folder_path)
-        
-        if not folder.exists():
+        try:
+            mtime_ns = os.stat(folder_path).st_mtime_ns
+        except OSError:
             return []
         
-        for ext in image_extensions:
-            # Procurar por extensões em minúsculo e maiúsculo
-            pattern_lower = f"*{ext.lower()}"
-            pattern_upper = f"*{ext.upper()}"
-            
-            # Adicionar ao set (automaticamente evita duplicatas)
-            image_files.update(folder.glob(pattern_lower))
-            image_files.update(folder.glob(pattern_upper))
+        # Pasta alterada há pouco: o mtime ainda não identifica o conteúdo com segurança
+        if time.time_ns() - mtime_ns < _MTIME_SETTLE_NS:
+            return list(_scan_images.__wrapped__(str(folder_path), mtime_ns))
         
-        # Converter caminhos Path para strings e ordenar
-        return sorted([str(img_path) for img_path in image_files])
+        # Cache invalidado quando o mtime da pasta muda (criação, remoção ou renomeação);
+        # quem altera a pasta por outros meios chama clear_image_scan_cache
+        return list(_scan_images(str(folder_path), mtime_ns))
+    
+    @staticmethod
+    def clear_image_scan_cache():
+        """Descarta as listagens de imagens em cache (próxima busca relê as pastas)."""
+        _scan_images.cache_clear()
     
     @staticmethod
     def ensure_directory_exists(directory_path: str) -> Path:
@@ -85,3 +115,65 @@ class FileUtils:
             Lista de caminhos dos modelos
         """
         return config.get_available_local_models()
+    
+    @staticmethod
+    def dumps_json(data: Any, pretty: bool = False) -> bytes:
+        """
+        Serializa um objeto para JSON em bytes UTF-8.
+        
+        Args:
+            data: Objeto serializável
+            pretty: Se deve indentar a saída (2 espaços)
+            
+        Returns:
+            JSON codificado em UTF-8 (usa orjson quando disponível)
+        """
+        if orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if pretty else 0)
+            return orjson.dumps(data, option=option)
+        
+        if pretty:
+            return json.dumps(data, indent=2, ensure_ascii=False, default=_to_builtin).encode('utf-8')
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=_to_builtin).encode('utf-8')
+    
+    @staticmethod
+    def write_jsonl(output_file: str, items: Iterable[Dict[str, Any]]) -> Path:
+        """
+        Escreve itens em formato JSON Lines (um objeto JSON por linha).
+        
+        Args:
+            output_file: Caminho do arquivo de saída (.jsonl)
+            items: Itens a gravar (pode ser um gerador)
+            
+        Returns:
+            Path do arquivo salvo
+        """
+        if orjson is not None:
+            # OPT_APPEND_NEWLINE evita concatenar bytes a cada linha
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+            lines = (orjson.dumps(item, option=option) for item in items)
+        else:
+            lines = (FileUtils.dumps_json(item) + b'\n' for item in items)
+        
+        with open(output_file, 'wb') as f:
+            f.writelines(lines)
+        
+        return Path(output_file)
+    
+    @staticmethod
+    def read_jsonl(input_file: str) -> Iterator[Dict[str, Any]]:
+        """
+        Lê um arquivo JSON Lines linha a linha.
+        
+        Args:
+            input_file: Caminho do arquivo .jsonl
+            
+        Returns:
+            Iterador com um objeto por linha
+        """
+        loads = orjson.loads if orjson is not None else json.loads
+        
+        with open(input_file, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield loads(line)
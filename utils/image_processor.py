@@ -6,8 +6,15 @@ Utilitários básicos para processamento de imagens.
 """
 
 import os
-from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+try:
+    import imagesize
+except ImportError:  # imagesize é opcional; usa o Pillow para ler o cabeçalho
+    imagesize = None
+
+# Extensões aceitas (comparadas em minúsculo)
+VALID_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'})
 
 
 class ImageProcessor:
@@ -24,18 +31,53 @@ class ImageProcessor:
         Returns:
             Dicionário com informações da imagem
         """
-        if not image_path or not os.path.exists(image_path):
+        if not image_path:
             return {}
         
-        valid_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-        path_obj = Path(image_path)
+        extension = os.path.splitext(image_path)[1]
+        if extension.lower() not in VALID_EXTENSIONS:
+            return {}
         
-        if path_obj.suffix.lower() not in valid_extensions:
+        # Uma única chamada de sistema: existência e tamanho
+        try:
+            size_bytes = os.stat(image_path).st_size
+        except OSError:
             return {}
         
+        width, height = ImageProcessor.get_image_dimensions(image_path)
+        
         return {
-            'name': path_obj.name,
-            'size_bytes': path_obj.stat().st_size,
-            'extension': path_obj.suffix,
-            'directory': str(path_obj.parent)
+            'name': os.path.basename(image_path),
+            'size_bytes': size_bytes,
+            'extension': extension,
+            'directory': os.path.dirname(image_path) or '.',
+            'width': width,
+            'height': height
         }
+    
+    @staticmethod
+    def get_image_dimensions(image_path: str) -> Tuple[int, int]:
+        """
+        Lê as dimensões da imagem apenas pelo cabeçalho, sem decodificar pixels.
+        
+        Args:
+            image_path: Caminho da imagem
+            
+        Returns:
+            Tupla (largura, altura) ou (0, 0) se não for possível ler
+        """
+        if imagesize is not None:
+            try:
+                width, height = imagesize.get(image_path)
+                if width > 0 and height > 0:
+                    return width, height
+            except ValueError:
+                pass
+        
+        # Fallback: Pillow também lê só o cabeçalho até que os pixels sejam acessados
+        try:
+            from PIL import Image
+            with Image.open(image_path) as img:
+                return img.size
+        except Exception:
+            return 0, 0
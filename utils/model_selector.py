@@ -7,11 +7,37 @@ Permite ao usuário escolher entre modelos disponíveis nas pastas models/pretra
 Inclui funcionalidade de download automático de modelos quando necessário.
 """
 
+import fnmatch
 import os
 import sys
+from operator import itemgetter
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, List, Optional, Union
 
+# Modelos YoloV8 oficiais disponíveis para download
+_OFFICIAL_MODELS = {
+    'yolov8n.pt': {'size': '6.2MB', 'speed': '🚀🚀🚀🚀🚀', 'accuracy': '⭐⭐⭐', 'desc': 'Nano - Ultra rápido'},
+    'yolov8s.pt': {'size': '21.5MB', 'speed': '🚀🚀🚀🚀', 'accuracy': '⭐⭐⭐⭐', 'desc': 'Small - Balanceado'},
+    'yolov8m.pt': {'size': '49.7MB', 'speed': '🚀🚀🚀', 'accuracy': '⭐⭐⭐⭐⭐', 'desc': 'Medium - Boa precisão'},
+    'yolov8l.pt': {'size': '83.7MB', 'speed': '🚀🚀', 'accuracy': '⭐⭐⭐⭐⭐⭐', 'desc': 'Large - Alta precisão'},
+    'yolov8x.pt': {'size': '136.7MB', 'speed': '🚀', 'accuracy': '⭐⭐⭐⭐⭐⭐⭐', 'desc': 'Extra Large - Máxima precisão'}
+}
+OFFICIAL_MODELS = MappingProxyType(_OFFICIAL_MODELS)
+
+# Classe YOLO importada sob demanda: o ultralytics (torch, cv2...) só é
+# carregado quando um download é realmente solicitado
+_YOLO_CLASS = None
+
+
+def _yolo():
+    """Importa (uma única vez) e retorna a classe YOLO do ultralytics."""
+    global _YOLO_CLASS
+    if _YOLO_CLASS is None:
+        from ultralytics import YOLO
+        _YOLO_CLASS = YOLO
+    return _YOLO_CLASS
+
 
 class ModelSelector:
     """
@@ -19,22 +45,31 @@ class ModelSelector:
     Inclui funcionalidade de download automático quando não há modelos disponíveis
     """
     
-    # Modelos YoloV8 oficiais disponíveis para download
-    OFFICIAL_MODELS = {
-        'yolov8n.pt': {'size': '6.2MB', 'speed': '🚀🚀🚀🚀🚀', 'accuracy': '⭐⭐⭐', 'desc': 'Nano - Ultra rápido'},
-        'yolov8s.pt': {'size': '21.5MB', 'speed': '🚀🚀🚀🚀', 'accuracy': '⭐⭐⭐⭐', 'desc': 'Small - Balanceado'},
-        'yolov8m.pt': {'size': '49.7MB', 'speed': '🚀🚀🚀', 'accuracy': '⭐⭐⭐⭐⭐', 'desc': 'Medium - Boa precisão'},
-        'yolov8l.pt': {'size': '83.7MB', 'speed': '🚀🚀', 'accuracy': '⭐⭐⭐⭐⭐⭐', 'desc': 'Large - Alta precisão'},
-        'yolov8x.pt': {'size': '136.7MB', 'speed': '🚀', 'accuracy': '⭐⭐⭐⭐⭐⭐⭐', 'desc': 'Extra Large - Máxima precisão'}
-    }
+    # Modelos oficiais (somente leitura, compartilhados com o módulo)
+    OFFICIAL_MODELS = OFFICIAL_MODELS
+    
+    # Menu de download pré-renderizado uma única vez (os modelos oficiais são fixos)
+    _DOWNLOAD_MODEL_NAMES = tuple(OFFICIAL_MODELS)
+    _DOWNLOAD_MENU_TEXT = "".join(
+        f"   {i}. {name}\n"
+        f"      📊 {info['desc']}\n"
+        f"      💾 Tamanho: {info['size']}\n"
+        f"      ⚡ Velocidade: {info['speed']}\n"
+        f"      🎯 Precisão: {info['accuracy']}\n\n"
+        for i, (name, info) in enumerate(OFFICIAL_MODELS.items(), 1)
+    )
     
     def __init__(self):
         self.pretrained_dir = Path('models/pretrained')
         self.trained_dir = Path('models/trained')
         
-        # Garantir que os diretórios existem
-        self.pretrained_dir.mkdir(parents=True, exist_ok=True)
-        self.trained_dir.mkdir(parents=True, exist_ok=True)
+        # Cache da listagem (tuplas de MappingProxyType, somente leitura),
+        # invalidado quando o mtime de alguma das pastas muda
+        self._cache = None
+        self._cache_key = None
+        
+        # Caminho absoluto da pasta de pré-treinados, resolvido na primeira consulta
+        self._pretrained_resolved = None
     
     def list_available_models(self) -> Dict[str, List[Dict]]:
         """
@@ -43,43 +78,80 @@ class ModelSelector:
         Returns:
             Dict contendo listas de modelos pré-treinados e customizados
         """
+        key = (self._dir_mtime(self.pretrained_dir), self._dir_mtime(self.trained_dir))
+        if self._cache is not None and key == self._cache_key:
+            return self._copy_cached_models()
+        
         models = {
             'pretrained': [],
             'trained': []
         }
         
         # Verificar modelos pré-treinados
-        if self.pretrained_dir.exists():
-            for model_file in self.pretrained_dir.glob('*.pt'):
-                try:
-                    models['pretrained'].append({
-                        'name': model_file.name,
-                        'path': str(model_file),
-                        'size': model_file.stat().st_size / (1024*1024),  # MB
-                        'type': 'pretrained'
-                    })
-                except (OSError, IOError) as e:
-                    print(f"⚠️  Aviso: Não foi possível acessar {model_file.name}: {e}")
+        models['pretrained'] = self._scan_models(self.pretrained_dir, 'pretrained')
         
         # Verificar modelos treinados/customizados
-        if self.trained_dir.exists():
-            for model_file in self.trained_dir.glob('*.pt'):
-                try:
-                    models['trained'].append({
-                        'name': model_file.name,
-                        'path': str(model_file),
-                        'size': model_file.stat().st_size / (1024*1024),  # MB
-                        'type': 'trained'
-                    })
-                except (OSError, IOError) as e:
-                    print(f"⚠️  Aviso: Não foi possível acessar {model_file.name}: {e}")
+        models['trained'] = self._scan_models(self.trained_dir, 'trained')
         
         # Ordenar modelos por nome
-        models['pretrained'].sort(key=lambda x: x['name'])
-        models['trained'].sort(key=lambda x: x['name'])
+        models['pretrained'].sort(key=itemgetter('name'))
+        models['trained'].sort(key=itemgetter('name'))
+        
+        self._cache = {
+            model_type: tuple(MappingProxyType(dict(model)) for model in found)
+            for model_type, found in models.items()
+        }
+        self._cache_key = key
         
         return models
     
+    def _copy_cached_models(self) -> Dict[str, List[Dict]]:
+        """Cópias da listagem em cache: alterações do chamador não afetam o cache."""
+        return {model_type: [dict(model) for model in found] for model_type, found in self._cache.items()}
+    
+    @staticmethod
+    def _dir_mtime(directory: Path) -> int:
+        """Retorna o mtime (ns) da pasta, ou 0 se ela não existir."""
+        try:
+            return os.stat(directory).st_mtime_ns
+        except OSError:
+            return 0
+    
+    @staticmethod
+    def _scan_models(directory: Path, model_type: str) -> List[Dict]:
+        """
+        Lista os arquivos .pt de uma pasta com uma única passada de os.scandir
+        
+        Args:
+            directory: Pasta a ser percorrida
+            model_type: Tipo atribuído aos modelos ('pretrained' ou 'trained')
+            
+        Returns:
+            Lista de modelos encontrados (sem ordenação; vazia se a pasta não existir)
+        """
+        found = []
+        
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.pt'):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        found.append({
+                            'name': entry.name,
+                            'path': entry.path,
+                            'size': entry.stat().st_size / (1024*1024),  # MB
+                            'type': model_type
+                        })
+                    except (OSError, IOError) as e:
+                        print(f"⚠️  Aviso: Não foi possível acessar {entry.name}: {e}")
+        except FileNotFoundError:
+            pass
+        
+        return found
+    
     def get_model_info(self, model_path: Union[str, Path]) -> Dict:
         """
         Obtém informações detalhadas sobre um modelo específico
@@ -102,7 +174,7 @@ class ModelSelector:
         
         try:
             size_mb = model_path.stat().st_size / (1024*1024)
-            model_type = 'pretrained' if 'pretrained' in str(model_path) else 'trained'
+            model_type = 'pretrained' if self._is_pretrained(model_path) else 'trained'
             
             return {
                 'name': model_path.name,
@@ -119,6 +191,12 @@ class ModelSelector:
                 'error': str(e)
             }
     
+    def _is_pretrained(self, model_path: Path) -> bool:
+        """Verifica se o modelo está diretamente na pasta models/pretrained."""
+        if self._pretrained_resolved is None:
+            self._pretrained_resolved = self.pretrained_dir.resolve()
+        return model_path.parent.resolve() == self._pretrained_resolved
+    
     def display_models_menu(self, models: Dict[str, List[Dict]]) -> List[Dict]:
         """
         Exibe o menu de modelos disponíveis
@@ -129,25 +207,24 @@ class ModelSelector:
         Returns:
             Lista unificada de todos os modelos
         """
-        all_models = []
+        all_models = models['pretrained'] + models['trained']
         
-        print("\n📦 MODELOS DISPONÍVEIS:")
+        # Menu montado em memória e escrito de uma vez (uma escrita em vez de uma por modelo)
+        parts = ["\n📦 MODELOS DISPONÍVEIS:\n"]
         
         # Listar modelos pré-treinados
         if models['pretrained']:
-            print("\n   🚀 Pré-treinados (models/pretrained/):")
-            for model in models['pretrained']:
-                idx = len(all_models) + 1
-                all_models.append(model)
-                print(f"      {idx}. {model['name']} ({model['size']:.1f}MB)")
+            parts.append("\n   🚀 Pré-treinados (models/pretrained/):\n")
+            parts.extend(f"      {idx}. {model['name']} ({model['size']:.1f}MB)\n"
+                         for idx, model in enumerate(models['pretrained'], 1))
         
         # Listar modelos treinados/customizados
         if models['trained']:
-            print("\n   🎯 Customizados (models/trained/):")
-            for model in models['trained']:
-                idx = len(all_models) + 1
-                all_models.append(model)
-                print(f"      {idx}. {model['name']} ({model['size']:.1f}MB)")
+            parts.append("\n   🎯 Customizados (models/trained/):\n")
+            parts.extend(f"      {idx}. {model['name']} ({model['size']:.1f}MB)\n"
+                         for idx, model in enumerate(models['trained'], len(models['pretrained']) + 1))
+        
+        sys.stdout.write("".join(parts))
         
         return all_models
     
@@ -171,12 +248,16 @@ class ModelSelector:
             return self.handle_no_models_scenario()
         
         # Adicionar opção de download mesmo quando há modelos
-        print(f"\n   � {len(all_models) + 1}. Baixar novo modelo oficial")
+        download_idx = len(all_models) + 1
+        print(f"\n   � {download_idx}. Baixar novo modelo oficial")
+        
+        prompt = f"\n🔧 Digite o número do modelo (1-{download_idx}) ou Enter para usar o primeiro:"
+        invalid_msg = f"❌ Número inválido! Digite um valor entre 1 e {download_idx}"
         
         # Seleção do usuário
         while True:
             try:
-                print(f"\n🔧 Digite o número do modelo (1-{len(all_models) + 1}) ou Enter para usar o primeiro:")
+                print(prompt)
                 choice = input(">>> ").strip()
                 
                 if choice == "":
@@ -187,7 +268,7 @@ class ModelSelector:
                 choice_num = int(choice)
                 
                 # Opção de download
-                if choice_num == len(all_models) + 1:
+                if choice_num == download_idx:
                     selected_model_name = self.display_download_menu()
                     if selected_model_name:
                         if self.download_model(selected_model_name):
@@ -205,7 +286,7 @@ class ModelSelector:
                     print(f"✅ Modelo selecionado: {selected_model['name']}")
                     return selected_model['path']
                 else:
-                    print(f"❌ Número inválido! Digite um valor entre 1 e {len(all_models) + 1}")
+                    print(invalid_msg)
             
             except ValueError:
                 print("❌ Por favor, digite apenas números!")
@@ -240,24 +321,17 @@ class ModelSelector:
         Returns:
             True se o modelo existe e é válido
         """
-        model_path = Path(model_path)
-        
-        # Verificar se existe
-        if not model_path.exists():
-            return False
+        model_path = os.fspath(model_path)
         
-        # Verificar extensão
-        if model_path.suffix.lower() != '.pt':
+        # Verificar extensão (apenas string, antes de qualquer acesso ao disco)
+        if not model_path.lower().endswith('.pt'):
             return False
         
-        # Verificar se não está vazio
+        # Verificar se existe e não está vazio com um único stat
         try:
-            if model_path.stat().st_size == 0:
-                return False
+            return os.stat(model_path).st_size > 0
         except (OSError, IOError):
             return False
-        
-        return True
     
     def find_models_by_pattern(self, pattern: str) -> List[str]:
         """
@@ -269,15 +343,14 @@ class ModelSelector:
         Returns:
             Lista de caminhos de modelos que correspondem ao padrão
         """
-        matches = []
-        
-        # Buscar em ambas as pastas
-        for directory in [self.pretrained_dir, self.trained_dir]:
-            if directory.exists():
-                for model_file in directory.glob(f"{pattern}*.pt"):
-                    matches.append(str(model_file))
+        models = self.list_available_models()
+        wanted = f"{pattern}*.pt"
         
-        return sorted(matches)
+        # Filtra a listagem já em memória (mesma semântica do glob, sem nova varredura)
+        return sorted(
+            model['path'] for model in models['pretrained'] + models['trained']
+            if fnmatch.fnmatchcase(model['name'], wanted)
+        )
 
     def download_model(self, model_name: str) -> bool:
         """
@@ -293,30 +366,42 @@ class ModelSelector:
             print(f"\n📥 Baixando modelo {model_name}...")
             print("   Isso pode levar alguns minutos dependendo da sua conexão...")
             
-            # Importar YOLO aqui para evitar dependência circular
+            # Importação tardia: evita dependência circular e o custo quando não há download
             try:
-                from ultralytics import YOLO
+                YOLO = _yolo()
             except ImportError:
                 print("❌ Erro: ultralytics não instalado!")
                 print("   Execute: pip install ultralytics")
                 return False
             
+            # Pasta de destino criada apenas quando há download (listagem tolera pastas ausentes)
+            self.pretrained_dir.mkdir(parents=True, exist_ok=True)
+            
             # Baixar o modelo (YOLO automaticamente baixa se não existir)
             model = YOLO(model_name)
             
-            # Verificar se o modelo foi baixado no diretório correto
-            downloaded_path = Path(model_name)
+            # Mover para o diretório correto se o download caiu no diretório atual
             target_path = self.pretrained_dir / model_name
-            
-            # Mover para o diretório correto se necessário
-            if downloaded_path.exists() and downloaded_path != target_path:
-                downloaded_path.rename(target_path)
+            try:
+                os.replace(model_name, target_path)
                 print(f"✅ Modelo movido para: {target_path}")
-            elif target_path.exists():
-                print(f"✅ Modelo baixado com sucesso: {target_path}")
-            else:
+            except FileNotFoundError:
+                pass
+            
+            # Um único stat confirma que o modelo está no destino e não está vazio
+            try:
+                downloaded = os.stat(target_path).st_size > 0
+            except OSError:
+                downloaded = False
+            
+            if not downloaded:
                 print("❌ Erro: Não foi possível localizar o modelo baixado")
                 return False
+            
+            print(f"✅ Modelo baixado com sucesso: {target_path}")
+            
+            # Novo arquivo na pasta: a próxima listagem relê o disco
+            self._cache = None
                 
             return True
             
@@ -336,17 +421,9 @@ class ModelSelector:
         print("="*70)
         print("\n🤖 Modelos disponíveis para download:")
         
-        models_list = list(self.OFFICIAL_MODELS.keys())
-        
-        for i, model_name in enumerate(models_list, 1):
-            info = self.OFFICIAL_MODELS[model_name]
-            print(f"   {i}. {model_name}")
-            print(f"      📊 {info['desc']}")
-            print(f"      💾 Tamanho: {info['size']}")
-            print(f"      ⚡ Velocidade: {info['speed']}")
-            print(f"      🎯 Precisão: {info['accuracy']}")
-            print()
+        models_list = self._DOWNLOAD_MODEL_NAMES
         
+        sys.stdout.write(self._DOWNLOAD_MENU_TEXT)
         print("   0. ❌ Cancelar")
         
         while True:
@@ -444,7 +521,7 @@ class ModelSelector:
         print("   📝 Formatos aceitos: .pt (PyTorch)")
         
         print("\n📥 DOWNLOAD DIRETO:")
-        for model_name, info in self.OFFICIAL_MODELS.items():
+        for model_name, info in OFFICIAL_MODELS.items():
             print(f"   • {model_name} - {info['desc']} ({info['size']})")
         
         print("\n💡 DICAS:")
@@ -453,6 +530,18 @@ class ModelSelector:
         print("   3. Os modelos são carregados automaticamente na próxima execução")
 
 
+# Instância compartilhada pelas funções de conveniência (reaproveita o cache da listagem)
+_selector: Optional[ModelSelector] = None
+
+
+def _get_selector() -> ModelSelector:
+    """Retorna a instância compartilhada de ModelSelector, criando-a na primeira chamada."""
+    global _selector
+    if _selector is None:
+        _selector = ModelSelector()
+    return _selector
+
+
 # Função de conveniência para uso direto
 def select_model() -> Optional[str]:
     """
@@ -461,8 +550,7 @@ def select_model() -> Optional[str]:
     Returns:
         Caminho do modelo selecionado ou None se cancelado
     """
-    selector = ModelSelector()
-    return selector.select_model_interactive()
+    return _get_selector().select_model_interactive()
 
 
 def get_available_models() -> Dict[str, List[Dict]]:
@@ -472,5 +560,4 @@ def get_available_models() -> Dict[str, List[Dict]]:
     Returns:
         Dict contendo listas de modelos pré-treinados e customizados
     """
-    selector = ModelSelector()
-    return selector.list_available_models()
+    return _get_selector().list_available_models()
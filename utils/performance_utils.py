@@ -5,12 +5,121 @@ Performance Utilities
 Utilitários para medição de performance.
 """
 
-from typing import Dict, Any, List
+import sys
+from time import perf_counter_ns
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Indisponível no Windows; o delta de memória fica em 0
+    resource = None
+
+# Valor padrão de métricas ausentes (nunca vence um mínimo)
+_INF = float('inf')
+
+# ru_maxrss é informado em KB no Linux e em bytes no macOS
+_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def _peak_rss_bytes() -> int:
+    """Retorna o pico de memória residente do processo em bytes (0 se indisponível)."""
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+class PerformanceAccumulator:
+    """
+    Acumula métricas de performance em fluxo, sem guardar os resultados.
+    
+    Média e variância do tempo por imagem são mantidas pelo algoritmo de
+    Welford (numericamente estável), com memória constante.
+    """
+    
+    __slots__ = ('count', 'total_detections', 'total_time', '_mean_time', '_m2_time')
+    
+    def __init__(self):
+        self.count = 0
+        self.total_detections = 0
+        self.total_time = 0.0
+        self._mean_time = 0.0
+        self._m2_time = 0.0
+    
+    def update(self, detections_count: int, elapsed: float):
+        """
+        Registra uma imagem processada.
+        
+        Args:
+            detections_count: Número de detecções da imagem
+            elapsed: Tempo de processamento da imagem em segundos
+        """
+        self.count += 1
+        self.total_detections += detections_count
+        self.total_time += elapsed
+        
+        delta = elapsed - self._mean_time
+        self._mean_time += delta / self.count
+        self._m2_time += delta * (elapsed - self._mean_time)
+    
+    @property
+    def std_time(self) -> float:
+        """Desvio padrão amostral do tempo por imagem (0 com menos de duas amostras)."""
+        return (self._m2_time / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+    
+    def metrics(self) -> Dict[str, float]:
+        """
+        Retorna as métricas acumuladas no formato de calculate_performance_metrics.
+        
+        Returns:
+            Dicionário com métricas de performance e desvio padrão do tempo por imagem
+        """
+        metrics = PerformanceUtils._build_metrics(self.count, self.total_detections, self.total_time)
+        metrics['std_time_per_image'] = self.std_time
+        return metrics
 
 
 class PerformanceUtils:
     """Utilitários de performance."""
     
+    @staticmethod
+    def time_function(func: Callable, *args, repeat: int = 1, track_memory: bool = False,
+                      **kwargs) -> Tuple[Any, float, Optional[int]]:
+        """
+        Mede o tempo de execução de uma função com o relógio monotônico de alta resolução.
+        
+        Funções compiladas na primeira chamada (Numba, torch.compile, TensorRT)
+        devem ser aquecidas antes (ex.: YoloV8InferenceService.warmup), para que
+        a compilação não entre na medição.
+        
+        Args:
+            func: Função a ser medida
+            *args: Argumentos posicionais da função
+            repeat: Número de execuções; retorna o menor tempo (melhor de N)
+            track_memory: Se deve medir também o crescimento do pico de RSS
+            **kwargs: Argumentos nomeados da função
+            
+        Returns:
+            Tupla (resultado da última execução, tempo em segundos, crescimento
+            do pico de RSS em bytes ou None sem track_memory)
+        """
+        best_ns = None
+        result = None
+        rss_before = _peak_rss_bytes() if track_memory else None
+        
+        for _ in range(max(repeat, 1)):
+            start_ns = perf_counter_ns()
+            result = func(*args, **kwargs)
+            elapsed_ns = perf_counter_ns() - start_ns
+            if best_ns is None or elapsed_ns < best_ns:
+                best_ns = elapsed_ns
+        
+        # ru_maxrss é um pico: o delta mostra quanto a chamada elevou o máximo do processo
+        rss_growth = _peak_rss_bytes() - rss_before if track_memory else None
+        
+        return result, best_ns * 1e-9, rss_growth
+    
     @staticmethod
     def calculate_performance_metrics(results: List[Dict[str, Any]], total_time: float) -> Dict[str, float]:
         """
@@ -24,15 +133,108 @@ class PerformanceUtils:
             Dicionário com métricas de performance
         """
         total_images = len(results)
-        total_detections = sum(r.get('detections_count', 0) for r in results)
         
-        metrics = {
+        # Listas pequenas: o custo de chamar o NumPy supera a soma em Python
+        if total_images < 64:
+            total_detections = sum(r.get('detections_count', 0) for r in results)
+        else:
+            counts = np.fromiter((r.get('detections_count', 0) for r in results),
+                                 dtype=np.int64, count=total_images)
+            total_detections = int(counts.sum())
+        
+        return PerformanceUtils._build_metrics(total_images, total_detections, total_time)
+    
+    @staticmethod
+    def _build_metrics(total_images: int, total_detections: int, total_time: float) -> Dict[str, float]:
+        """Monta o dicionário de métricas com um recíproco por denominador (0 quando vazio)."""
+        inv_time = 1.0 / total_time if total_time > 0 else 0.0
+        inv_images = 1.0 / total_images if total_images > 0 else 0.0
+        
+        return {
             'total_time': total_time,
-            'images_per_second': total_images / total_time if total_time > 0 else 0,
-            'detections_per_second': total_detections / total_time if total_time > 0 else 0,
-            'average_time_per_image': total_time / total_images if total_images > 0 else 0,
+            'images_per_second': total_images * inv_time,
+            'detections_per_second': total_detections * inv_time,
+            'average_time_per_image': total_time * inv_images,
             'total_images': total_images,
             'total_detections': total_detections
         }
+    
+    @staticmethod
+    def metrics_oneline(metrics: Dict[str, float]) -> str:
+        """
+        Formata as métricas em uma linha ASCII compacta (logs, CI, CSV).
         
-        return metrics
+        Args:
+            metrics: Dicionário retornado por calculate_performance_metrics
+            
+        Returns:
+            Linha no formato "t=...s ips=... dps=... tpi=...ms"
+        """
+        return (f"t={metrics.get('total_time', 0.0):.3f}s "
+                f"ips={metrics.get('images_per_second', 0.0):.1f} "
+                f"dps={metrics.get('detections_per_second', 0.0):.1f} "
+                f"tpi={metrics.get('average_time_per_image', 0.0) * 1000:.1f}ms")
+    
+    @staticmethod
+    def compare_models(benchmarks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compara os resultados de benchmark de vários modelos.
+        
+        Uma única passada extrai as colunas dos benchmarks; mais rápido, com
+        mais detecções, menor e ranking saem de compare_models_vec.
+        
+        Args:
+            benchmarks: Resultados de run_benchmark (um por modelo)
+            
+        Returns:
+            Dicionário com modelo mais rápido, com mais detecções, menor e ranking
+        """
+        count = len(benchmarks)
+        names = [None] * count
+        times = np.empty(count, dtype=np.float64)
+        detections = np.empty(count, dtype=np.float64)
+        sizes = np.empty(count, dtype=np.float64)
+        
+        for i, benchmark in enumerate(benchmarks):
+            names[i] = benchmark.get('model_name')
+            times[i] = benchmark.get('avg_inference_time', _INF)
+            detections[i] = benchmark.get('avg_detections', 0)
+            sizes[i] = benchmark.get('model_size', _INF)
+        
+        return PerformanceUtils.compare_models_vec(names, times, detections, sizes)
+    
+    @staticmethod
+    def compare_models_vec(names: List[str], times: np.ndarray, detections: np.ndarray,
+                           sizes: np.ndarray) -> Dict[str, Any]:
+        """
+        Compara modelos a partir de colunas já em arrays (ex.: varredura de checkpoints).
+        
+        Args:
+            names: Nomes dos modelos
+            times: Tempo médio de inferência de cada modelo
+            detections: Média de detecções por imagem de cada modelo
+            sizes: Tamanho de cada modelo em MB
+            
+        Returns:
+            Dicionário com modelo mais rápido, com mais detecções, menor e ranking
+        """
+        if len(names) == 0:
+            return {'fastest_model': None, 'most_detections_model': None, 'smallest_model': None, 'ranking': []}
+        
+        scores = detections / np.maximum(times, 1e-3)
+        order = np.argsort(-scores, kind='stable')
+        
+        return {
+            'fastest_model': names[int(times.argmin())],
+            'most_detections_model': names[int(detections.argmax())],
+            'smallest_model': names[int(sizes.argmin())],
+            'ranking': [
+                {
+                    'model': names[i],
+                    'performance_score': float(scores[i]),
+                    'avg_inference_time': float(times[i]),
+                    'avg_detections': float(detections[i])
+                }
+                for i in order.tolist()
+            ]
+        }
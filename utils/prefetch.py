@@ -0,0 +1,83 @@
+"""
+Prefetch Utilities
+==================
+
+Produção de itens em segundo plano (decode de lotes) com fila limitada.
+"""
+
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+# Marca o fim da produção na fila
+_DONE = object()
+
+
+class _ProducerError:
+    """Exceção da thread produtora, repassada ao consumidor pela fila."""
+    
+    __slots__ = ('error',)
+    
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def iter_in_background(items: Iterable[T], maxsize: int = 2) -> Iterator[T]:
+    """
+    Consome um iterável em uma thread produtora e entrega os itens ao consumidor.
+    
+    O próximo item é produzido enquanto o consumidor processa o atual; a fila
+    limitada controla quantos itens ficam em memória. Exceções da produção são
+    relançadas no consumidor, e o fim do consumo (break, erro ou descarte do
+    iterador) sinaliza a thread para encerrar sem ficar presa na fila.
+    
+    Args:
+        items: Iterável avaliado na thread produtora (ex.: gerador de lotes)
+        maxsize: Quantidade máxima de itens prontos aguardando o consumidor
+            
+    Returns:
+        Iterador com os itens na ordem produzida
+    """
+    queue = Queue(maxsize=maxsize)
+    stop = Event()
+    
+    def put(item) -> bool:
+        # Espera por espaço na fila, desistindo se o consumidor já parou
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            put(_DONE)
+    
+    Thread(target=produce, daemon=True).start()
+    
+    try:
+        while True:
+            item = queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        # Libera os itens já produzidos que não serão consumidos
+        try:
+            while True:
+                queue.get_nowait()
+        except Empty:
+            pass